@@ -1,13 +1,217 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
 from . import models
+from .events import notify_status, notify_statuses
+from .search import RANK_CANDIDATES, search
+
+
+def estimated_count(model, using):
+    """
+    The planner's estimate of a Postgres table's row count, or None if it has none yet.
+    """
+    db = connections[using]
+    with db.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [db.ops.quote_name(model._meta.db_table)])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts unfiltered lists of large Postgres tables from the table statistics instead of
+    running `COUNT(*)` over every row.\n
+    The estimate can be off by the rows written since the last `ANALYZE`, so the last page
+    may come up short. Filtered lists, small tables and other backends are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if connections[queryset.db].vendor == 'postgresql' and not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate >= settings.ADMIN_ESTIMATED_COUNT_MIN:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables that grow without bound: estimated page counts, no
+    second unfiltered `COUNT(*)`, and the `list_defer` fields left out of list queries.\n
+    `search_fields` are matched exactly so the search box is answered from their indexes;
+    admin's own `=` prefix compares upper-cased text, which no index covers.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_defer = ()
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = request.resolver_match
+        if self.list_defer and match and match.url_name.endswith('_changelist'):
+            queryset = queryset.defer(*self.list_defer)
+        return queryset
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        matches = Q()
+        for lookup in self.get_search_fields(request):
+            try:
+                matches |= Q(**{lookup: get_fields_from_path(self.model, lookup)[-1].to_python(term)})
+            except ValidationError:
+                continue
+        return (queryset.filter(matches) if matches else queryset.none()), False
+
+
+@admin.register(models.CustomUser)
+class CustomUserAdmin(LargeTableAdmin, UserAdmin):
+    # UserAdmin supplies the add form with password fields and the password change view.
+    list_display = ('student_id', 'email', 'full_name', 'session', 'department', 'role', 'is_active', 'is_staff', 'created_at')
+    list_select_related = ('department', 'role')
+    list_filter = ('is_active', 'is_staff', 'department')
+    search_fields = ('email', 'full_name', 'student_id', 'session')
+    search_help_text = "Name, email, student ID or session; words match their start."
+    readonly_fields = ('photo_digest', 'documents_version', 'last_login', 'created_at', 'updated_at')
+    filter_horizontal = ('groups', 'user_permissions')
+    # Not UserAdmin's username-based ones: the model's ordering and every form field.
+    ordering = None
+    fieldsets = None
+    add_fieldsets = (
+        (None, {
+            'classes': ('wide',),
+            'fields': ('email', 'student_id', 'session', 'department', 'full_name', 'usable_password', 'password1', 'password2'),
+        }),
+    )
+    list_defer = ('password', 'photo_digest', 'name_father', 'name_mother')
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        # Each permission's label names its content type; load them in the same query.
+        if db_field.name == 'user_permissions':
+            kwargs['queryset'] = db_field.remote_field.model.objects.select_related('content_type')
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Served from the full-text index instead of an icontains scan per column.
+        if not search_term.strip():
+            return queryset, False
+        ids = [row['id'] for row in search('students', search_term, RANK_CANDIDATES)]
+        return queryset.filter(pk__in=ids), False
+
+
+@admin.register(models.StudentRecord)
+class StudentRecordAdmin(LargeTableAdmin):
+    list_display = ('student', 'course', 'year', 'semester', 'gpa')
+    list_select_related = ('student', 'course')
+    raw_id_fields = ('student', 'course')
+    search_fields = ('student__student_id', 'course__course_code')
+    search_help_text = "Exact student ID or course code."
+
+
+STATUSES = (
+    models.ServiceRequest.PENDING,
+    models.ServiceRequest.PROCESSING,
+    models.ServiceRequest.COMPLETED,
+    models.ServiceRequest.FAILED,
+)
+
+
+class ServiceStatusFilter(admin.SimpleListFilter):
+    # Fixed choices, where the default filter would scan the table for distinct statuses.
+    title = 'status'
+    parameter_name = 'status'
+
+    def lookups(self, request, model_admin):
+        return [(value, value) for value in STATUSES]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(status=self.value())
+        return queryset
+
+
+def change_status(queryset, status, **fields):
+    """
+    Move the selected service requests to `status`, announcing each change to waiting
+    clients. Returns how many changed.
+    """
+    with transaction.atomic():
+        pks = list(queryset.exclude(status=status).values_list('pk', flat=True))
+        models.ServiceRequest.objects.filter(pk__in=pks).update(status=status, updated_at=timezone.now(), **fields)
+        notify_statuses(pks, status)
+    return len(pks)
+
+
+@admin.register(models.ServiceRequest)
+class ServiceRequestAdmin(LargeTableAdmin):
+    list_display = ('id', 'student', 'request_doc', 'status', 'attempts', 'created_at', 'updated_at')
+    list_select_related = ('student', 'request_doc')
+    list_filter = (ServiceStatusFilter, 'request_doc')
+    raw_id_fields = ('student',)
+    search_fields = ('id', 'student__student_id')
+    search_help_text = "Exact request ID or student ID."
+    readonly_fields = ('attempts', 'claimed_at', 'result_file', 'error', 'created_at', 'updated_at')
+    list_defer = ('error', 'result_file')
+    actions = ('requeue', 'mark_failed')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Editing one request's status on its change form announces it like the actions do.
+        if change and 'status' in form.changed_data:
+            notify_status(obj.pk, obj.status)
+
+    @admin.action(description="Requeue selected service requests")
+    def requeue(self, request, queryset):
+        # A fresh start: the full SERVICE_MAX_ATTEMPTS and no retry backoff.
+        changed = change_status(
+            queryset, models.ServiceRequest.PENDING, claimed_at=None, error=None, attempts=0, not_before=None,
+        )
+        self.message_user(request, f"Requeued {changed} service request(s).", messages.SUCCESS)
+
+    @admin.action(description="Mark selected service requests as failed")
+    def mark_failed(self, request, queryset):
+        changed = change_status(queryset, models.ServiceRequest.FAILED, claimed_at=None, error='Cancelled by staff')
+        self.message_user(request, f"Marked {changed} service request(s) as failed.", messages.SUCCESS)
+
+
+@admin.register(models.OTP)
+class OTPAdmin(LargeTableAdmin):
+    list_display = ('email', 'created_at')
+    search_fields = ('email',)
+    search_help_text = "Exact email."
+
+
+@admin.register(models.Course)
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ('course_code', 'course_title', 'dept_name', 'course_credit')
+    list_select_related = ('dept_name',)
+    list_filter = ('dept_name',)
+    search_fields = ('course_code', 'course_title')
+
+
+@admin.register(models.Department)
+class DepartmentAdmin(admin.ModelAdmin):
+    list_display = ('short_name', 'name', 'faculty')
+    list_select_related = ('faculty',)
+    list_filter = ('faculty',)
+    search_fields = ('name', 'short_name')
+
+
+@admin.register(models.Faculty)
+class FacultyAdmin(admin.ModelAdmin):
+    list_display = ('short_name', 'name')
+    search_fields = ('name', 'short_name')
 
 
-admin.site.register(models.CustomUser)
-admin.site.register(models.OTP)
 admin.site.register(models.Role)
-admin.site.register(models.Faculty)
-admin.site.register(models.Department)
-admin.site.register(models.Course)
-admin.site.register(models.StudentRecord)
 admin.site.register(models.Document)
-admin.site.register(models.ServiceRequest)
\ No newline at end of file
@@ -0,0 +1,207 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from . import models
+
+# Output column -> ResultSummary lookup, per analytics endpoint
+GROUPS = {
+    'courses': {
+        'course_code': 'course__course_code',
+        'course_title': 'course__course_title',
+        'department': 'course__dept_name',
+    },
+    'departments': {
+        'department': 'course__dept_name',
+        'short_name': 'course__dept_name__short_name',
+        'faculty': 'course__dept_name__faculty',
+    },
+    'faculties': {
+        'faculty': 'course__dept_name__faculty',
+        'short_name': 'course__dept_name__faculty__short_name',
+        'session': 'session',
+    },
+}
+
+FILTERS = {
+    'session': 'session',
+    'department': 'course__dept_name',
+    'faculty': 'course__dept_name__faculty',
+}
+
+
+def passed(gpa):
+    # A result passes when it earns its credits, as on the transcript.
+    return gpa > 0
+
+
+def session_of(record):
+    if models.StudentRecord.student.is_cached(record):
+        return record.student.session
+    return models.CustomUser.objects.filter(pk=record.student_id).values_list('session', flat=True).first()
+
+
+class SummaryChanges:
+    """
+    Changes to `ResultSummary` rows collected while results are written.\n
+    `add` and `remove` count a result in or out of its (course, session) totals; `save`
+    applies the net change to each row with one relative `UPDATE`, so concurrent writers
+    never overwrite each other's counts.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(lambda: [0, 0, 0.0])
+
+    def add(self, course_id, session, gpa, sign=1):
+        totals = self.totals[course_id, session]
+        totals[0] += sign
+        totals[1] += sign * passed(gpa)
+        totals[2] += sign * gpa
+
+    def remove(self, course_id, session, gpa):
+        self.add(course_id, session, gpa, sign=-1)
+
+    def save(self):
+        totals = {key: change for key, change in self.totals.items() if any(change)}
+        with transaction.atomic():
+            # Nothing to take away from a missing row, e.g. while its course is being deleted.
+            lock_summaries(totals, create={key for key, change in totals.items() if change[0] > 0})
+            for (course_id, session), (results, passed_results, gpa_total) in totals.items():
+                models.ResultSummary.objects.filter(course_id=course_id, session=session).update(
+                    results=F('results') + results,
+                    passed=F('passed') + passed_results,
+                    gpa_total=F('gpa_total') + gpa_total,
+                )
+
+
+def lock_summaries(keys, create=None):
+    """
+    Lock the `ResultSummary` rows of `keys`, `(course_id, session)` pairs, until the
+    transaction ends, first creating empty rows for the keys in `create` (all of them by
+    default).\n
+    Writers counting results of the same course and session then take turns from reading
+    the stored results to applying their change, so two imports of one sheet can't both
+    count the same result as new.
+    """
+    create = keys if create is None else create
+    if create:
+        models.ResultSummary.objects.bulk_create(
+            [models.ResultSummary(course_id=course_id, session=session) for course_id, session in create],
+            ignore_conflicts=True,
+        )
+    if keys:
+        # In primary-key order, so writers locking overlapping rows can't deadlock.
+        list(
+            models.ResultSummary.objects
+            .select_for_update()
+            .filter(course_id__in={key[0] for key in keys}, session__in={key[1] for key in keys})
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+
+def count_upserted_results(records):
+    """
+    The summary changes for upserting `records`, a dict of `StudentRecord`s keyed by
+    `(student_id, course_id, year, semester)`: results already stored are counted out at
+    their current GPA and every record is counted in at its new one.\n
+    Must run in the transaction that writes the records; the summaries they count towards
+    stay locked until it ends.
+    """
+    student_ids = {key[0] for key in records}
+    sessions = dict(models.CustomUser.objects.filter(pk__in=student_ids).values_list('pk', 'session'))
+    lock_summaries({(record.course_id, sessions[record.student_id]) for record in records.values()})
+    stored = models.StudentRecord.objects.filter(
+        student_id__in=student_ids, course_id__in={key[1] for key in records},
+    ).values_list('student_id', 'course_id', 'year', 'semester', 'gpa')
+
+    changes = SummaryChanges()
+    for student_id, course_id, year, semester, gpa in stored.iterator():
+        if (student_id, course_id, year, semester) in records:
+            changes.remove(course_id, sessions[student_id], gpa)
+    for record in records.values():
+        changes.add(record.course_id, sessions[record.student_id], record.gpa)
+    return changes
+
+
+def move_student_results(student_id, old_session, new_session):
+    """
+    Recount a student's results under their new session.
+    """
+    changes = SummaryChanges()
+    for course_id, gpa in models.StudentRecord.objects.filter(student_id=student_id).values_list('course_id', 'gpa'):
+        changes.remove(course_id, old_session, gpa)
+        changes.add(course_id, new_session, gpa)
+    changes.save()
+
+
+def rebuild_summaries(chunk_size=100, progress=None):
+    """
+    Recompute `ResultSummary` from every `StudentRecord`, `chunk_size` courses per
+    transaction. `progress` is called after each chunk with `(courses_done, courses)`.
+    """
+    course_ids = list(models.Course.objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(course_ids), chunk_size):
+        chunk = course_ids[start:start + chunk_size]
+        totals = (
+            models.StudentRecord.objects
+            .filter(course_id__in=chunk)
+            .values('course', session=F('student__session'))
+            .annotate(results=Count('id'), passed=Count('id', filter=Q(gpa__gt=0)), gpa_total=Sum('gpa'))
+            .order_by()
+        )
+        with transaction.atomic():
+            models.ResultSummary.objects.filter(course_id__in=chunk).delete()
+            models.ResultSummary.objects.bulk_create(
+                [
+                    models.ResultSummary(
+                        course_id=row['course'], session=row['session'], results=row['results'],
+                        passed=row['passed'], gpa_total=row['gpa_total'],
+                    )
+                    for row in totals
+                ],
+                # A result written meanwhile may have recreated a row; the recount wins.
+                update_conflicts=True,
+                unique_fields=['course', 'session'],
+                update_fields=['results', 'passed', 'gpa_total'],
+            )
+        if progress:
+            progress(start + len(chunk), len(course_ids))
+
+
+def summarize(group, **filters):
+    """
+    Result statistics per `GROUPS[group]` row, aggregated from the summary table.
+    """
+    columns = GROUPS[group]
+    summaries = models.ResultSummary.objects.filter(results__gt=0)
+    for name, value in filters.items():
+        if value is not None:
+            summaries = summaries.filter(**{FILTERS[name]: value})
+
+    rows = (
+        summaries
+        .values(*columns.values())
+        .annotate(total_results=Sum('results'), total_passed=Sum('passed'), total_gpa=Sum('gpa_total'))
+        .order_by(*columns.values())
+    )
+    return [
+        {
+            **{name: row[lookup] for name, lookup in columns.items()},
+            'results': row['total_results'],
+            'average_gpa': round(row['total_gpa'] / row['total_results'], 2),
+            'pass_rate': round(row['total_passed'] / row['total_results'], 4),
+        }
+        for row in rows
+    ]
+
+
+def get_summary(group, **filters):
+    """
+    `summarize`, cached for `ANALYTICS_CACHE_TTL` seconds per group and filters.
+    """
+    key = 'analytics:{}:{}'.format(group, ':'.join(f'{name}={filters.get(name)}' for name in sorted(FILTERS)))
+    return cache.get_or_set(key, lambda: summarize(group, **filters), settings.ANALYTICS_CACHE_TTL)
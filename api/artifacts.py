@@ -0,0 +1,102 @@
+import errno
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+
+class ArtifactCache:
+    """
+    On-disk cache of rendered documents.\n
+    Entries are named `<doc>-<student>-v<version>-<issue date>.html`, where the version
+    is the student's `documents_version`, so a bumped version or a new day simply misses
+    and the stale entries are dropped when the new one is stored. Hits refresh the
+    file's mtime and the oldest files are evicted once the directory grows past
+    `max_bytes`.
+    """
+
+    def __init__(self, root=None, max_bytes=None):
+        self.root = Path(root or settings.DOCUMENT_CACHE_ROOT)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.DOCUMENT_CACHE_MAX_BYTES
+        self._lock = threading.Lock()
+
+    def key(self, document_name, student_id, version, issued_on):
+        return f'{document_name.lower()}-{student_id}-v{version}-{issued_on.isoformat()}.html'
+
+    def path(self, key):
+        return self.root / key
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, chunks):
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.render-')
+
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        self.discard_older_versions(key)
+        self.evict()
+        return self.path(key)
+
+    def discard_older_versions(self, key):
+        prefix = key.rsplit('-v', 1)[0] + '-v'
+        for path in self.root.glob(prefix + '*.html'):
+            if path.name != key:
+                path.unlink(missing_ok=True)
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.root):
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+def link_or_copy(source, target):
+    """
+    Give `target` the contents of `source` without copying bytes when both live on the
+    same filesystem. A hard link also keeps the document alive after the cache evicts it.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+    except OSError as exc:
+        if exc.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+        shutil.copyfile(source, target)
+
+
+def get_artifact_cache():
+    return ArtifactCache()
@@ -0,0 +1,81 @@
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from rest_framework import exceptions
+from rest_framework.views import APIView
+
+
+def served_by_asgi(request):
+    """
+    Whether the request came in through the ASGI server. Under WSGI an async handler
+    still ties up a worker thread for as long as it runs.
+    """
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+class AsyncAPIView(APIView):
+    """
+    `APIView` for coroutine handlers.\n
+    Dispatch, authentication and the handler all run on the event loop: authenticators
+    that provide `aauthenticate()` are awaited directly, others are run in a thread.
+    Every handler of a subclass must be `async def` (Django refuses mixed views).
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request):
+        # Resolve request.user up front; DRF would otherwise do it lazily and
+        # synchronously the first time the view touches it.
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, 'aauthenticate'):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
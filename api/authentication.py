@@ -0,0 +1,151 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import LocalTTLCache, stamps_are_shared
+
+VERSION_KEY = 'auth-user-version:{}'
+
+user_cache = LocalTTLCache(
+    max_size=settings.AUTH_USER_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL,
+)
+
+
+def user_cache_enabled():
+    # Other processes would never see this one's bumps and keep serving a changed user.
+    return settings.AUTH_USER_CACHE_TTL > 0 and stamps_are_shared(settings.AUTH_USER_CACHE_ALIAS)
+
+
+def version_cache():
+    return caches[settings.AUTH_USER_CACHE_ALIAS]
+
+
+def get_user_version(user_id):
+    cache = version_cache()
+    key = VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh stamp rather than 0, so an evicted version can never
+        # resurrect an entry cached under an older one.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_user_version(user_id):
+    cache = version_cache()
+    key = VERSION_KEY.format(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_user_version(user_id):
+    version_cache().set(VERSION_KEY.format(user_id), time.time_ns(), None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` that resolves the token's user from an in-process cache.\n
+    Entries are keyed by user id plus a version stamp kept in the
+    `AUTH_USER_CACHE_ALIAS` cache; saving or deleting a user bumps the stamp
+    (see `api.signals`), so every process drops its copy on the next request.
+    When that cache can't share the stamp between server processes, every request
+    loads the user instead. `aauthenticate()` does the same with the async cache and
+    ORM for `AsyncAPIView`.
+    """
+
+    def get_user(self, validated_token):
+        user = self.get_cached_user(self.get_user_id(validated_token))
+        self.check_user(user, validated_token)
+        return user
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user = await self.aget_cached_user(self.get_user_id(validated_token))
+        self.check_user(user, validated_token)
+        return user
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+    def get_cached_user(self, user_id):
+        if not user_cache_enabled():
+            return self.fetch_user(user_id)
+
+        key = (user_id, get_user_version(user_id))
+        row = user_cache.get(key)
+
+        if row is None:
+            user = self.fetch_user(user_id)
+            user_cache.set(key, self.dump_user(user))
+            return user
+
+        return self.load_user(row)
+
+    async def aget_cached_user(self, user_id):
+        if not user_cache_enabled():
+            return await self.afetch_user(user_id)
+
+        key = (user_id, await aget_user_version(user_id))
+        row = user_cache.get(key)
+
+        if row is None:
+            user = await self.afetch_user(user_id)
+            user_cache.set(key, self.dump_user(user))
+            return user
+
+        return self.load_user(row)
+
+    def fetch_user(self, user_id):
+        try:
+            return self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+    async def afetch_user(self, user_id):
+        try:
+            return await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+
+    def dump_user(self, user):
+        field_names = [f.attname for f in self.user_model._meta.concrete_fields]
+        return field_names, [getattr(user, name) for name in field_names]
+
+    def load_user(self, row):
+        # Each request gets its own instance so nothing it mutates leaks into the cache.
+        field_names, values = row
+        return self.user_model.from_db(DEFAULT_DB_ALIAS, field_names, values)
@@ -0,0 +1,250 @@
+import itertools
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.contrib.auth.hashers import make_password
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import models
+
+PASSWORD = 'benchmark-password'
+SEMESTERS = ('1st', '2nd')
+DOCUMENTS = ('Testimonial', 'Certificate', 'Transcript')
+
+
+def seed(users, courses, records_per_user, requests_per_user, batch_size=1000, rng=None):
+    """
+    Fill an empty database with a realistic intake: departments, courses, active students
+    with their results and a history of service requests. Rows are bulk inserted, so no
+    signals fire. Returns the seeded students.
+    """
+    rng = rng or random.Random(0)
+
+    faculty = models.Faculty.objects.create(name='Engineering', short_name='ENG')
+    departments = models.Department.objects.bulk_create(
+        models.Department(name=f'Department {n}', short_name=f'D{n}', faculty=faculty) for n in range(8)
+    )
+    role = models.Role.objects.create(name='Student')
+    documents = models.Document.objects.bulk_create(models.Document(name=name) for name in DOCUMENTS)
+    course_rows = models.Course.objects.bulk_create(
+        (
+            models.Course(
+                course_code=f'C-{n:04d}',
+                course_title=f'Course {n}',
+                dept_name=departments[n % len(departments)],
+                course_credit=rng.choice((1.5, 3.0, 4.0)),
+            )
+            for n in range(courses)
+        ),
+        batch_size=batch_size,
+    )
+
+    # Hashing once keeps seeding fast; every student shares the benchmark password.
+    password = make_password(PASSWORD)
+    students = models.CustomUser.objects.bulk_create(
+        (
+            models.CustomUser(
+                email=f'student{n}@bench.example.com',
+                password=password,
+                student_id=100000 + n,
+                session='2020-21',
+                department=departments[n % len(departments)],
+                role=role,
+                is_active=True,
+            )
+            for n in range(users)
+        ),
+        batch_size=batch_size,
+    )
+
+    def records():
+        for student in students:
+            for n, course in enumerate(rng.sample(course_rows, min(records_per_user, len(course_rows)))):
+                yield models.StudentRecord(
+                    student=student,
+                    course=course,
+                    year=2020 + n // 10,
+                    semester=SEMESTERS[n // 5 % 2],
+                    gpa=rng.choice((2.0, 2.5, 3.0, 3.25, 3.5, 3.75, 4.0)),
+                )
+
+    def service_requests():
+        statuses = (models.ServiceRequest.COMPLETED,) * 8 + (models.ServiceRequest.PENDING, models.ServiceRequest.FAILED)
+        for student in students:
+            for _ in range(requests_per_user):
+                yield models.ServiceRequest(student=student, request_doc=rng.choice(documents), status=rng.choice(statuses))
+
+    for rows in (records(), service_requests()):
+        while batch := list(itertools.islice(rows, batch_size)):
+            batch[0].__class__.objects.bulk_create(batch)
+
+    return students
+
+
+@dataclass
+class Call:
+    method: str
+    path: str
+    body: dict = None
+    token: str = None
+
+
+def scenarios(students, tokens):
+    """
+    The benchmarked endpoints, each a function of the iteration number returning a `Call`.
+    """
+    registrations = itertools.count(1)
+
+    def register(n):
+        number = next(registrations)
+        return Call('POST', '/api/register/', {
+            'email': f'new{number}@bench.example.com',
+            'password': PASSWORD,
+            'student_id': 900000 + number,
+            'session': '2024-25',
+            'role': students[0].role_id,
+            'department': students[n % len(students)].department_id,
+        })
+
+    def token(n):
+        return Call('POST', '/api/token/', {'email': students[n % len(students)].email, 'password': PASSWORD})
+
+    def me(n):
+        return Call('GET', '/api/v1/users/me/', token=tokens[n % len(tokens)])
+
+    def services(n):
+        return Call('GET', '/api/v1/services/', token=tokens[n % len(tokens)])
+
+    def request_service(n):
+        return Call('POST', '/api/v1/services/?doc_type=transcript', token=tokens[n % len(tokens)])
+
+    return {
+        'register': register,
+        'token': token,
+        'users-me': me,
+        'services-list': services,
+        'services-create': request_service,
+    }
+
+
+def access_tokens(students, count):
+    return [str(AccessToken.for_user(student)) for student in students[:count]]
+
+
+def percentile(ordered, p):
+    # Nearest-rank percentile of an already sorted list.
+    index = max(int(round(p / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(name, transport, latencies, elapsed, statuses, queries=None, concurrency=1):
+    ordered = sorted(latencies)
+    return {
+        'endpoint': name,
+        'transport': transport,
+        'requests': len(ordered),
+        'concurrency': concurrency,
+        'requests_per_second': round(len(ordered) / elapsed, 1),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+        'status_codes': {str(code): statuses.count(code) for code in sorted(set(statuses))},
+    }
+
+
+class ClientRunner:
+    """
+    Drives the views through Django's test client, in this thread, so the queries of each
+    request can be counted.
+    """
+    transport = 'test-client'
+
+    def __init__(self):
+        self.client = Client()
+
+    def call(self, call):
+        headers = {'Authorization': f'Bearer {call.token}'} if call.token else {}
+        body = json.dumps(call.body) if call.body is not None else ''
+        return self.client.generic(call.method, call.path, body, content_type='application/json', headers=headers).status_code
+
+    def run(self, name, make_call, count, warmup):
+        for n in range(warmup):
+            self.call(make_call(n))
+
+        latencies, statuses, queries = [], [], []
+        started = time.perf_counter()
+        for n in range(warmup, warmup + count):
+            with CaptureQueriesContext(connection) as captured:
+                request_started = time.perf_counter()
+                statuses.append(self.call(make_call(n)))
+                latencies.append(time.perf_counter() - request_started)
+            queries.append(len(captured))
+        return summarize(name, self.transport, latencies, time.perf_counter() - started, statuses, queries)
+
+
+class HTTPRunner:
+    """
+    Drives the full WSGI stack (middleware included) over real sockets against a threaded
+    server started in this process.
+    """
+    transport = 'http'
+
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        self.server.set_app(get_wsgi_application())
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def call(self, call):
+        headers = {'Content-Type': 'application/json'}
+        if call.token:
+            headers['Authorization'] = f'Bearer {call.token}'
+        data = json.dumps(call.body).encode() if call.body is not None else None
+        request = urllib.request.Request(self.base_url + call.path, data=data, headers=headers, method=call.method)
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+
+    def timed(self, call):
+        started = time.perf_counter()
+        status = self.call(call)
+        return time.perf_counter() - started, status
+
+    def run(self, name, make_call, count, warmup):
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(lambda n: self.call(make_call(n)), range(warmup)))
+            started = time.perf_counter()
+            results = list(pool.map(lambda n: self.timed(make_call(n)), range(warmup, warmup + count)))
+            elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, _ in results]
+        statuses = [status for _, status in results]
+        return summarize(name, self.transport, latencies, elapsed, statuses, concurrency=self.concurrency)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
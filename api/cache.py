@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Backends that can't hand a version stamp from one server process to another.
+UNSHARED_BACKENDS = (LocMemCache, DummyCache)
+
+
+def stamps_are_shared(alias):
+    """
+    Whether a version stamp set in the `alias` cache is seen by every server process:
+    there is only one (`SERVER_WORKERS`), or the cache lives outside them.
+    """
+    return settings.SERVER_WORKERS == 1 or not isinstance(caches[alias], UNSHARED_BACKENDS)
+
+
+class LocalTTLCache:
+    """
+    Small thread-safe in-process LRU cache with a per-entry TTL.\n
+    Used where a shared cache round trip would cost about as much as the
+    query it replaces. Keeps `hits`/`misses` counters for the metrics output.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'max_size': self.max_size,
+        }
@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+from django.db.models import F
+
+from . import models
+from .cache import stamps_are_shared
+from .responses import precompress
+
+VERSION_KEY = 'catalog-version'
+
+
+@dataclass(frozen=True)
+class Catalog:
+    version: int
+    etag: str
+    bodies: dict
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def get_version():
+    """
+    The catalog's version stamp, kept in the default cache.
+
+    When that cache can't share the stamp between server processes, the version also
+    turns over every `CATALOG_LOCAL_TTL` seconds, as bumps made in other processes never
+    reach this one.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    if not stamps_are_shared(DEFAULT_CACHE_ALIAS):
+        return version, int(time.monotonic() // settings.CATALOG_LOCAL_TTL)
+    return version
+
+
+def bump_version():
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def build_payload():
+    return {
+        'roles': list(models.Role.objects.order_by('id').values('id', 'name', 'description')),
+        'faculties': list(models.Faculty.objects.order_by('id').values('id', 'name', 'short_name', 'description')),
+        'departments': list(
+            models.Department.objects.order_by('id').values('id', 'name', 'short_name', 'description', 'faculty')
+        ),
+        'courses': list(
+            models.Course.objects.order_by('course_code').values(
+                'id', 'course_code', 'course_title', 'course_credit', department=F('dept_name'),
+            )
+        ),
+        'documents': list(models.Document.objects.order_by('id').values('id', 'name', 'description')),
+    }
+
+
+def encode(payload):
+    return precompress(json.dumps(payload, separators=(',', ':')).encode())
+
+
+def get_catalog():
+    """
+    The reference data for forms, built once per catalog version and kept in memory.\n
+    Each request costs one cache lookup of the version stamp; saving or deleting any of
+    the catalog models bumps it (see `api.signals`) and the next request rebuilds. With a
+    shared cache that holds in every process; otherwise other processes catch up within
+    `CATALOG_LOCAL_TTL` seconds. The body is stored pre-encoded, so compression is also
+    paid once.
+    """
+    global _catalog
+
+    version = get_version()
+    catalog = _catalog
+    if catalog is not None and catalog.version == version:
+        return catalog
+
+    with _lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = Catalog(version, *encode(build_payload()))
+        return _catalog
@@ -0,0 +1,69 @@
+from django.utils import timezone
+from django.utils.html import format_html
+
+from .transcripts import iter_transcript_html
+
+
+def student_header(student):
+    department = student.department.name if student.department_id else ''
+    return format_html(
+        '<h2>{}</h2>\n<p>Student ID: {} &middot; Session: {} &middot; {}</p>\n',
+        student.full_name or student.email,
+        student.student_id,
+        student.session,
+        department,
+    )
+
+
+def html_page(title, body_chunks, issued_on=None):
+    yield format_html('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{}</title></head><body>\n', title)
+    yield format_html('<h1>{}</h1>\n', title)
+    for chunk in body_chunks:
+        if isinstance(chunk, str):
+            yield chunk
+        else:
+            yield from chunk
+    yield format_html('<p>Issued on {}</p>\n</body></html>\n', (issued_on or timezone.localdate()).isoformat())
+
+
+def render_testimonial(service_request, issued_on=None):
+    student = service_request.student
+    return html_page('Testimonial', [
+        student_header(student),
+        format_html(
+            '<p>This is to certify that {} is a student of this university, session {}.</p>\n',
+            student.full_name or student.email,
+            student.session,
+        ),
+    ], issued_on)
+
+
+def render_certificate(service_request, issued_on=None):
+    student = service_request.student
+    return html_page('Certificate', [
+        student_header(student),
+        format_html(
+            '<p>This is to certify that {} has completed the requirements of session {}.</p>\n',
+            student.full_name or student.email,
+            student.session,
+        ),
+    ], issued_on)
+
+
+def render_transcript(service_request, issued_on=None):
+    student = service_request.student
+    return html_page('Transcript', [student_header(student), iter_transcript_html(student)], issued_on)
+
+
+# Document names (case-insensitive) mapped to their renderers. Each renderer takes the
+# request and the issue date printed on the document, and returns an iterable of text
+# chunks so large documents never sit in memory whole.
+RENDERERS = {
+    'testimonial': render_testimonial,
+    'certificate': render_certificate,
+    'transcript': render_transcript,
+}
+
+
+def get_renderer(document):
+    return RENDERERS.get(document.name.lower())
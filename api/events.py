@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'service_request_status'
+
+
+class Subscription:
+    """
+    A waiting connection's interest in one service request.\n
+    Notifications can arrive from any thread; they are handed to the subscriber's event
+    loop and only count as a change when they differ from the last status it saw.
+    """
+
+    def __init__(self, hub, pk):
+        self.hub = hub
+        self.pk = pk
+        self.status = None
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def deliver(self, status):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, status)
+        except RuntimeError:
+            # The subscriber's loop is gone; it will unsubscribe on its way out.
+            pass
+
+    async def changed(self, timeout):
+        deadline = self.loop.time() + timeout
+        while (remaining := deadline - self.loop.time()) > 0:
+            try:
+                status = await asyncio.wait_for(self.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if status != self.status:
+                self.status = status
+                return status
+        return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class StatusHub:
+    """
+    Fans service request status changes out to every waiting connection in this process.\n
+    On Postgres a single background connection `LISTEN`s for the `pg_notify` sent by
+    `notify_status()`, in whichever process made the change. Other backends have no
+    cross-process channel, so one background thread polls the statuses of all watched
+    requests in a single query per `SERVICE_EVENTS_POLL_INTERVAL`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        self._statuses = {}
+        self._thread = None
+
+    def subscribe(self, pk):
+        subscription = Subscription(self, pk)
+        with self._lock:
+            self._subscriptions[pk].add(subscription)
+            if self._thread is None:
+                target = self._listen if connection.vendor == 'postgresql' else self._poll
+                self._thread = threading.Thread(target=target, name='service-status-hub', daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            waiting = self._subscriptions.get(subscription.pk)
+            if waiting is None:
+                return
+            waiting.discard(subscription)
+            if not waiting:
+                del self._subscriptions[subscription.pk]
+                self._statuses.pop(subscription.pk, None)
+
+    def publish(self, pk, status):
+        with self._lock:
+            waiting = list(self._subscriptions.get(pk, ()))
+        for subscription in waiting:
+            subscription.deliver(status)
+
+    def poll_once(self):
+        with self._lock:
+            watched = list(self._subscriptions)
+        if not watched:
+            return
+
+        rows = models.ServiceRequest.objects.filter(pk__in=watched).values_list('pk', 'status')
+        for pk, status in rows:
+            if self._statuses.get(pk) != status:
+                self._statuses[pk] = status
+                self.publish(pk, status)
+
+    def _poll(self):
+        while True:
+            time.sleep(settings.SERVICE_EVENTS_POLL_INTERVAL)
+            try:
+                close_old_connections()
+                self.poll_once()
+            except Exception:
+                logger.exception("Polling service request statuses failed")
+
+    def _listen(self):
+        import psycopg
+
+        while True:
+            try:
+                with psycopg.connect(**connection.get_connection_params(), autocommit=True) as conn:
+                    conn.execute(f'LISTEN {CHANNEL}')
+                    # Catch up on anything that changed while we weren't listening.
+                    self.poll_once()
+                    close_old_connections()
+                    for notify in conn.notifies():
+                        pk, _, status = notify.payload.partition(':')
+                        self.publish(int(pk), status)
+            except Exception:
+                logger.exception("Listening for service request statuses failed, reconnecting")
+                time.sleep(settings.SERVICE_EVENTS_POLL_INTERVAL)
+
+
+status_hub = StatusHub()
+
+
+def notify_status(pk, status):
+    """
+    Announce that a service request moved to `status`. Delivered once the current
+    transaction commits.
+    """
+    notify_statuses([pk], status)
+
+
+def notify_statuses(pks, status):
+    """
+    `notify_status()` for many service requests at once, in a single query.
+    """
+    pks = list(pks)
+    if not pks:
+        return
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, pk::text || ':' || %s) FROM unnest(%s::bigint[]) AS pk",
+                [CHANNEL, status, pks],
+            )
+
+    def publish():
+        for pk in pks:
+            status_hub.publish(pk, status)
+
+    transaction.on_commit(publish)
@@ -0,0 +1,80 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+
+_pool = None
+_pool_lock = threading.Lock()
+# Serializes hashing in this process when there is no pool
+_inline_lock = threading.Lock()
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: web workers are threaded and hold open connections.
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+            )
+        return _pool
+
+
+def inline(fn, *args):
+    with _inline_lock:
+        return fn(*args)
+
+
+def hash_passwords(passwords):
+    """
+    Hash a list of raw passwords, spreading the work over a process pool.\n
+    With `PASSWORD_HASH_WORKERS` at 1 they are hashed one at a time in this process.
+    """
+    workers = settings.PASSWORD_HASH_WORKERS
+    if workers <= 1:
+        return [inline(make_password, password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(get_pool().map(make_password, passwords, chunksize=chunksize))
+
+
+def hash_password(password):
+    """
+    Hash one raw password in the pool, so concurrent requests never run more hashes at
+    once than there are `PASSWORD_HASH_WORKERS`.
+    """
+    if settings.PASSWORD_HASH_WORKERS <= 1:
+        return inline(make_password, password)
+    return get_pool().submit(make_password, password).result()
+
+
+def needs_rehash(encoded):
+    preferred = get_hasher()
+    return identify_hasher(encoded).algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+def verify(password, encoded):
+    valid = check_password(password, encoded)
+    if valid and needs_rehash(encoded):
+        return True, make_password(password)
+    return valid, None
+
+
+def verify_password(password, encoded):
+    """
+    Check a raw password against a stored hash in the pool.\n
+    Returns `(valid, upgraded)`, where `upgraded` is a fresh hash from the preferred
+    hasher when the stored one is outdated (another algorithm or weaker parameters).
+    """
+    if settings.PASSWORD_HASH_WORKERS <= 1:
+        return inline(verify, password, encoded)
+    return get_pool().submit(verify, password, encoded).result()
@@ -0,0 +1,99 @@
+import json
+import subprocess
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from api import benchmarks
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and measure the latency, throughput and queries per "
+        "request of the main endpoints, through the test client and an in-process HTTP server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--courses', type=int, default=200)
+        parser.add_argument('--records-per-user', type=int, default=40)
+        parser.add_argument('--requests-per-user', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=200, help="Measured requests per endpoint and transport.")
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--concurrency', type=int, default=4, help="Client threads for the HTTP transport.")
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help="Only run these endpoints (repeatable).")
+        parser.add_argument('--transport', choices=['test-client', 'http', 'both'], default='both')
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # The HTTP server's threads need a database file they can all open.
+            test_settings['NAME'] = str(Path(tempfile.mkdtemp()) / 'benchmark.sqlite3')
+
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # One client would trip the per-IP limits; load shedding stays on.
+            with override_settings(THROTTLE_RATES={}):
+                results = self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+
+    def benchmark(self, options):
+        seed = {
+            'users': options['users'],
+            'courses': options['courses'],
+            'records_per_user': options['records_per_user'],
+            'requests_per_user': options['requests_per_user'],
+        }
+        self.stdout.write(f"Seeding {seed}")
+        students = benchmarks.seed(**seed)
+        calls = benchmarks.scenarios(students, benchmarks.access_tokens(students, 50))
+
+        names = options['endpoints'] or list(calls)
+        unknown = set(names) - set(calls)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}. Choose from {', '.join(calls)}")
+
+        runners = []
+        if options['transport'] in ('test-client', 'both'):
+            runners.append(benchmarks.ClientRunner())
+        if options['transport'] in ('http', 'both'):
+            runners.append(benchmarks.HTTPRunner(options['concurrency']))
+
+        results = []
+        try:
+            for runner in runners:
+                for name in names:
+                    result = runner.run(name, calls[name], options['requests'], options['warmup'])
+                    results.append(result)
+                    queries = result['queries_per_request']
+                    self.stdout.write(
+                        f"{runner.transport:>11} {name:<16} {result['requests_per_second']:>8} req/s  "
+                        f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms"
+                        + (f"  {queries} queries" if queries is not None else "")
+                    )
+        finally:
+            for runner in runners:
+                if isinstance(runner, benchmarks.HTTPRunner):
+                    runner.close()
+
+        return {'commit': current_commit(), 'vendor': connection.vendor, 'seed': seed, 'results': results}
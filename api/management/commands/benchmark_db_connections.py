@@ -0,0 +1,99 @@
+import copy
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+from api import models
+
+# The default database without its pool, for the baselines
+UNPOOLED_ALIAS = 'benchmark-unpooled'
+
+
+def add_unpooled_alias():
+    settings_dict = copy.deepcopy(connections.settings[DEFAULT_DB_ALIAS])
+    settings_dict['OPTIONS'].pop('pool', None)
+    connections.settings[UNPOOLED_ALIAS] = settings_dict
+
+
+def simulated_request(alias):
+    # Mirror what Django's handlers do around a view: close_old_connections on
+    # request_started and request_finished, with one small query in between.
+    started = time.perf_counter()
+    close_old_connections()
+    models.CustomUser.objects.using(alias).filter(pk=1).values_list('pk', flat=True).first()
+    close_old_connections()
+    return time.perf_counter() - started
+
+
+def on_every_thread(pool, size, fn):
+    # Each task blocks on the barrier until all have run, so no thread can take two.
+    barrier = threading.Barrier(size)
+
+    def task(_):
+        fn()
+        barrier.wait()
+
+    list(pool.map(task, range(size)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second with a new database connection per request, "
+        "a persistent connection, and the configured settings (e.g. DB_POOL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+
+    def run(self, label, alias, conn_max_age, requests, concurrency):
+        # Every thread's connection shares this settings dict.
+        connections.settings[alias]['CONN_MAX_AGE'] = conn_max_age
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            started = time.perf_counter()
+            latencies = sorted(pool.map(lambda _: simulated_request(alias), range(requests)))
+            elapsed = time.perf_counter() - started
+            on_every_thread(pool, concurrency, lambda: connections[alias].close())
+
+        return {
+            'mode': label,
+            'requests': requests,
+            'concurrency': concurrency,
+            'requests_per_second': round(requests / elapsed, 1),
+            'p50_ms': round(statistics.median(latencies) * 1000, 3),
+            'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 3),
+        }
+
+    def handle(self, *args, **options):
+        # The baselines open their own connections even when the configured database
+        # hands them out from a pool.
+        add_unpooled_alias()
+        configured = connections.settings[DEFAULT_DB_ALIAS]['CONN_MAX_AGE']
+        pooled = 'pool' in connections.settings[DEFAULT_DB_ALIAS].get('OPTIONS', {})
+        modes = [
+            ('per-request', UNPOOLED_ALIAS, 0),
+            ('persistent', UNPOOLED_ALIAS, None),
+            ('pool' if pooled else 'configured', DEFAULT_DB_ALIAS, configured),
+        ]
+
+        results = []
+        for label, alias, conn_max_age in modes:
+            result = self.run(label, alias, conn_max_age, options['requests'], options['concurrency'])
+            results.append(result)
+            self.stdout.write(
+                f"{label:>12}: {result['requests_per_second']:>9} req/s  "
+                f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms"
+            )
+
+        connections.settings[DEFAULT_DB_ALIAS]['CONN_MAX_AGE'] = configured
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'vendor': connections[DEFAULT_DB_ALIAS].vendor, 'results': results}, f, indent=2)
@@ -0,0 +1,70 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hashers, make_password
+from django.core.management.base import BaseCommand
+
+from api.hashing import verify_password
+
+PASSWORD = 'benchmark-password'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure logins (password checks) per second per core for each configured hasher, "
+        "and through the password pool with concurrent requests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Checks per measurement.")
+        parser.add_argument('--concurrency', type=int, default=None, help="Request threads for the pool run, defaults to 2 x PASSWORD_HASH_WORKERS.")
+        parser.add_argument('--output', help="Write the results as JSON to this file.")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        results = []
+
+        for hasher in get_hashers():
+            encoded = make_password(PASSWORD, hasher=hasher.algorithm)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                check_password(PASSWORD, encoded)
+            elapsed = time.perf_counter() - started
+            results.append({
+                'mode': 'inline',
+                'hasher': hasher.algorithm,
+                'checks': iterations,
+                'ms_per_check': round(elapsed / iterations * 1000, 2),
+                'logins_per_second_per_core': round(iterations / elapsed, 1),
+            })
+
+        preferred = get_hashers()[0].algorithm
+        workers = settings.PASSWORD_HASH_WORKERS
+        concurrency = options['concurrency'] or 2 * workers
+        encoded = make_password(PASSWORD)
+        verify_password(PASSWORD, encoded)  # start the pool outside the measurement
+
+        with ThreadPoolExecutor(max_workers=concurrency) as threads:
+            started = time.perf_counter()
+            list(threads.map(lambda _: verify_password(PASSWORD, encoded), range(iterations * workers)))
+            elapsed = time.perf_counter() - started
+        results.append({
+            'mode': 'pool',
+            'hasher': preferred,
+            'checks': iterations * workers,
+            'workers': workers,
+            'concurrency': concurrency,
+            'logins_per_second': round(iterations * workers / elapsed, 1),
+            'logins_per_second_per_core': round(iterations * workers / elapsed / min(workers, os.cpu_count() or 1), 1),
+        })
+
+        for result in results:
+            per_core = result['logins_per_second_per_core']
+            self.stdout.write(f"{result['mode']:>6} {result['hasher']:<16} {per_core:>8} logins/s per core")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.openapi import generate, schema_drift
+
+
+class Command(BaseCommand):
+    help = "Write the OpenAPI schema to OPENAPI_SCHEMA_PATH, or check that the committed one is current."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Fail with a diff instead of writing when the schema is out of date.")
+
+    def handle(self, *args, **options):
+        path = Path(settings.OPENAPI_SCHEMA_PATH)
+        if options['check']:
+            drift = schema_drift()
+            if drift:
+                self.stdout.write(drift)
+                raise CommandError(f"{path} is out of date, run `python manage.py build_schema`")
+            self.stdout.write(f"{path} is up to date")
+            return
+
+        path.write_text(generate(), encoding='utf-8')
+        self.stdout.write(f"Wrote {path}")
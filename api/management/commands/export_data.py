@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.exports import FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream every student or every result, joined for registrar reporting, as CSV or JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['students', 'records'])
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+        parser.add_argument('--session', help="Only students of this session.")
+        parser.add_argument('--department', type=int, help="Only students of this department ID.")
+        parser.add_argument('--include-photo', action='store_true', help="Add the user_photo column to the students export.")
+        parser.add_argument('--output', help="File to write instead of stdout.")
+
+    def handle(self, *args, **options):
+        chunks = iter_export(
+            options['kind'],
+            options['format'],
+            include_photo=options['include_photo'],
+            session=options['session'],
+            department=options['department'],
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
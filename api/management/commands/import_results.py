@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.registration import iter_csv_rows
+from api.results import import_results, iter_xlsx_rows
+
+
+class Command(BaseCommand):
+    help = "Import a CSV or XLSX results sheet into student records, updating results that already exist."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Sheet with student_id, course_code, year, semester and gpa columns.")
+        parser.add_argument('--format', choices=['csv', 'xlsx'], help="Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=None, help="Rows per transaction (RESULTS_IMPORT_CHUNK_SIZE).")
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        sheet_format = options['format'] or path.suffix.lstrip('.').lower()
+        if sheet_format not in ('csv', 'xlsx'):
+            raise CommandError("Cannot tell the sheet format, pass --format csv or --format xlsx")
+        if not path.is_file():
+            raise CommandError(f"No such file: {path}")
+
+        def progress(summary):
+            self.stdout.write(f"{summary['rows']} row(s) read, {summary['written']} written, {summary['error_count']} rejected")
+
+        with path.open('rb') as sheet:
+            rows = iter_csv_rows(sheet) if sheet_format == 'csv' else iter_xlsx_rows(sheet)
+            summary = import_results(rows, chunk_size=options['chunk_size'], progress=progress)
+
+        for error in summary['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if summary['error_count'] > len(summary['errors']):
+            self.stderr.write(f"... and {summary['error_count'] - len(summary['errors'])} more rejected row(s)")
+        self.stdout.write(f"Imported {summary['written']} result(s) from {summary['rows']} row(s)")
+        if 'detail' in summary:
+            raise CommandError(f"Stopped early: {summary['detail']}")
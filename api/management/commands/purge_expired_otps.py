@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.otp import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired OTPs in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        total = 0
+        for deleted in purge_expired(options['batch_size']):
+            total += deleted
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(f"Deleted {total} expired OTP(s)")
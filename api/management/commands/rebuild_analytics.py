@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.analytics import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute the result summaries behind /api/v1/analytics/ from the student records."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=100, help="Courses recounted per transaction.")
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f"{done}/{total} course(s) recounted")
+
+        rebuild_summaries(options['chunk_size'], progress)
+        self.stdout.write("Result summaries rebuilt")
@@ -0,0 +1,25 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.services import run_workers
+
+
+class Command(BaseCommand):
+    help = "Run the worker pool that generates documents for pending service requests."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.SERVICE_WORKERS)
+        parser.add_argument('--poll-interval', type=float, default=settings.SERVICE_POLL_INTERVAL)
+
+    def handle(self, *args, **options):
+        def stop(signum, frame):
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            raise KeyboardInterrupt
+
+        signal.signal(signal.SIGTERM, stop)
+
+        self.stdout.write(f"Starting {options['workers']} service worker(s)")
+        run_workers(options['workers'], options['poll_interval'])
+        self.stdout.write("Service workers stopped")
@@ -0,0 +1,173 @@
+import bisect
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTERS = {
+    'api_throttled_total': 'Requests refused by rate limits or load shedding.',
+}
+
+current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """
+    What one request spent its time on. The active instance lives in a context variable,
+    which asgiref copies into `sync_to_async` threads, so queries an async view runs in
+    the ORM's thread are still counted.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.timings = defaultdict(float)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+def track_queries(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_tracking(connection):
+    if track_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_queries)
+
+
+def timed(phase):
+    """
+    Add the decorated function's run time to the current request's `phase` timing.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = current.get()
+            if metrics is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.timings[phase] += time.perf_counter() - started
+        return wrapper
+    return decorator
+
+
+class Series:
+    __slots__ = ('count', 'duration', 'queries', 'db_time', 'timings', 'buckets', 'over_budget')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.timings = defaultdict(float)
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.over_budget = 0
+
+
+class Registry:
+    """
+    In-process totals per `(view, method, status)`, rendered in the Prometheus text format.\n
+    Every server process keeps its own registry, so a scrape reports the process that
+    answered it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = defaultdict(Series)
+        self._counters = defaultdict(int)
+
+    def observe(self, view, method, status, duration, metrics, over_budget):
+        with self._lock:
+            series = self._series[view, method, status]
+            series.count += 1
+            series.duration += duration
+            series.queries += metrics.queries
+            series.db_time += metrics.db_time
+            for phase, seconds in metrics.timings.items():
+                series.timings[phase] += seconds
+            index = bisect.bisect_left(DURATION_BUCKETS, duration)
+            if index < len(DURATION_BUCKETS):
+                series.buckets[index] += 1
+            series.over_budget += over_budget
+
+    def increment(self, name, **labels):
+        with self._lock:
+            self._counters[name, tuple(sorted(labels.items()))] += 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+            self._counters.clear()
+
+    def render(self, extra=()):
+        with self._lock:
+            series = sorted(self._series.items())
+            lines = []
+
+            def family(name, kind, help_text, samples):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.extend(f'{name}{label_set} {value}' for label_set, value in samples)
+
+            def labels(key, **extra):
+                view, method, status = key
+                pairs = {'view': view, 'method': method, 'status': status, **extra}
+                return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in pairs.items()) + '}'
+
+            family('api_requests_total', 'counter', 'Requests served.',
+                   ((labels(k), s.count) for k, s in series))
+
+            family('api_request_duration_seconds', 'histogram', 'Request duration.', ())
+            for key, s in series:
+                cumulative = 0
+                for bound, observed in zip(DURATION_BUCKETS, s.buckets):
+                    cumulative += observed
+                    lines.append(f'api_request_duration_seconds_bucket{labels(key, le=repr(bound))} {cumulative}')
+                lines.append(f'api_request_duration_seconds_bucket{labels(key, le="+Inf")} {s.count}')
+                lines.append(f'api_request_duration_seconds_sum{labels(key)} {s.duration:.6f}')
+                lines.append(f'api_request_duration_seconds_count{labels(key)} {s.count}')
+
+            family('api_request_queries_total', 'counter', 'Database queries run by requests.',
+                   ((labels(k), s.queries) for k, s in series))
+            family('api_request_db_seconds_total', 'counter', 'Time requests spent in database queries.',
+                   ((labels(k), f'{s.db_time:.6f}') for k, s in series))
+            family('api_request_phase_seconds_total', 'counter', 'Time requests spent in instrumented phases.',
+                   ((labels(k, phase=phase), f'{seconds:.6f}') for k, s in series for phase, seconds in sorted(s.timings.items())))
+            family('api_request_query_budget_exceeded_total', 'counter', 'Requests that ran more queries than the budget.',
+                   ((labels(k), s.over_budget) for k, s in series))
+
+            counters = sorted(self._counters.items())
+            for name in sorted({name for (name, _), _ in counters}):
+                family(name, 'counter', COUNTERS.get(name, name), (
+                    ('{' + ','.join(f'{k}="{escape(v)}"' for k, v in pairs) + '}', value)
+                    for (counter, pairs), value in counters if counter == name
+                ))
+
+        for name, kind, help_text, value in extra:
+            family(name, kind, help_text, [('', value)])
+
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
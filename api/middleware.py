@@ -0,0 +1,79 @@
+import logging
+import random
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import RequestMetrics, current, registry
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the query count, database time, serializer time and total time of each request
+    against its URL name.\n
+    Totals are exposed at **metrics/** in the Prometheus text format, requests running
+    more than `REQUEST_QUERY_BUDGET` queries (0 disables the check) are logged as warnings, and with
+    `REQUEST_METRICS_SERVER_TIMING` the figures are sent back in a `Server-Timing` header.
+    Only a `REQUEST_METRICS_SAMPLE_RATE` fraction of requests is measured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def sampled(self):
+        rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        return rate >= 1 or random.random() < rate
+
+    def finish(self, request, response, metrics):
+        duration = metrics.elapsed()
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+
+        budget = settings.REQUEST_QUERY_BUDGET
+        over_budget = bool(budget) and metrics.queries > budget
+        if over_budget:
+            logger.warning(
+                "%s %s ran %d queries (budget %d), %.1f ms in the database",
+                request.method, request.path, metrics.queries, budget, metrics.db_time * 1000,
+            )
+
+        registry.observe(view, request.method, response.status_code, duration, metrics, over_budget)
+
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            timings = [f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"']
+            timings += [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in metrics.timings.items()]
+            timings.append(f'total;dur={duration * 1000:.2f}')
+            response['Server-Timing'] = ', '.join(timings)
+        return response
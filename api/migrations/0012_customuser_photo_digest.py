@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_document_customuser_department_servicerequest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='photo_digest',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
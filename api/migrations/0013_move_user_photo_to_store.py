@@ -0,0 +1,122 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 200
+# Undecodable photos spelled out in the error; the rest are only counted
+REPORT_LIMIT = 50
+
+# The photo store's layout as of this migration, frozen here so later changes to
+# api.storage can't change what it writes.
+DIGEST_RE = re.compile(r'[0-9a-f]{64}')
+
+
+def blob_path(digest):
+    return Path(settings.PHOTO_STORAGE_ROOT) / digest[:2] / digest[2:4] / digest
+
+
+def save_blob(data):
+    digest = hashlib.sha256(data).hexdigest()
+    path = blob_path(digest)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    return digest
+
+
+def decode_photo(value):
+    # Rows were written by clients as either bare base64 or a data URI. Anything
+    # else is reported rather than stored as garbage.
+    if value.startswith('data:') and ',' in value:
+        value = value.split(',', 1)[1]
+    try:
+        return base64.b64decode(''.join(value.split()), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def move_photos_to_store(apps, schema_editor):
+    """
+    Copy every photo into the blob store. The next migration drops `user_photo`, so a
+    photo that doesn't decode stops the migration, listing the rows for staff to fix or
+    clear before migrating again.
+    """
+    CustomUser = apps.get_model('api', 'CustomUser')
+    last_pk = 0
+    undecodable = []
+
+    while True:
+        batch = list(
+            CustomUser.objects
+            .filter(pk__gt=last_pk, user_photo__isnull=False)
+            .exclude(user_photo='')
+            .order_by('pk')
+            .only('pk', 'student_id', 'user_photo')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        for user in batch:
+            data = decode_photo(user.user_photo)
+            if data:
+                user.photo_digest = save_blob(data)
+            else:
+                undecodable.append(user)
+
+        CustomUser.objects.bulk_update(batch, ['photo_digest'])
+        last_pk = batch[-1].pk
+
+    if not undecodable:
+        return
+
+    lines = [f'  id {user.pk} (student_id {user.student_id})' for user in undecodable[:REPORT_LIMIT]]
+    if len(undecodable) > REPORT_LIMIT:
+        lines.append(f"  ... and {len(undecodable) - REPORT_LIMIT} more")
+    raise RuntimeError(
+        f"Found {len(undecodable)} user photo(s) that are not valid base64 and would be lost when "
+        "user_photo is dropped. Fix or clear user_photo on these rows of api_customuser and run "
+        "migrate again:\n" + '\n'.join(lines)
+    )
+
+
+def move_photos_to_row(apps, schema_editor):
+    CustomUser = apps.get_model('api', 'CustomUser')
+    last_pk = 0
+
+    while True:
+        batch = list(
+            CustomUser.objects
+            .filter(pk__gt=last_pk, photo_digest__isnull=False)
+            .order_by('pk')
+            .only('pk', 'photo_digest')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        for user in batch:
+            if DIGEST_RE.fullmatch(user.photo_digest) and blob_path(user.photo_digest).is_file():
+                user.user_photo = base64.b64encode(blob_path(user.photo_digest).read_bytes()).decode('ascii')
+
+        CustomUser.objects.bulk_update(batch, ['user_photo'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_customuser_photo_digest'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_photos_to_store, move_photos_to_row),
+    ]
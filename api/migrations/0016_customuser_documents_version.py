@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_servicerequest_queue_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='documents_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_customuser_documents_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(fields=['email', 'created_at'], name='otp_email_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['student', 'status', 'created_at'], name='service_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['created_at', 'id'], name='service_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentrecord',
+            index=models.Index(fields=['student', 'year', 'semester'], name='record_student_term_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(fields=['created_at'], name='otp_created_idx'),
+        ),
+    ]
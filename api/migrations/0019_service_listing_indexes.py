@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_otp_created_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['created_at', 'id'], name='service_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='service_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:37
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# Duplicate groups spelled out in the error; the rest are only counted
+REPORT_LIMIT = 50
+
+
+def check_duplicate_results(apps, schema_editor):
+    """
+    Refuse to add the constraint over results entered more than once for the same
+    (student, course, term). Which of them is right is for staff to decide, so the
+    conflicting rows are listed for them to clean up before migrating again.
+    """
+    StudentRecord = apps.get_model('api', 'StudentRecord')
+    duplicates = list(
+        StudentRecord.objects
+        .values('student', 'course', 'year', 'semester')
+        .annotate(rows=Count('id'))
+        .filter(rows__gt=1)
+        .order_by('student', 'course', 'year', 'semester')
+    )
+    if not duplicates:
+        return
+
+    lines = []
+    for group in duplicates[:REPORT_LIMIT]:
+        rows = (
+            StudentRecord.objects
+            .filter(student=group['student'], course=group['course'], year=group['year'], semester=group['semester'])
+            .order_by('id')
+            .values_list('id', 'gpa')
+        )
+        lines.append(
+            f"  student {group['student']}, course {group['course']}, year {group['year']}, "
+            f"semester {group['semester']}: " + ', '.join(f'id {pk} (gpa {gpa})' for pk, gpa in rows)
+        )
+    if len(duplicates) > REPORT_LIMIT:
+        lines.append(f"  ... and {len(duplicates) - REPORT_LIMIT} more")
+
+    raise RuntimeError(
+        f"Found {len(duplicates)} result(s) entered more than once. Delete all but the right row of "
+        "each from api_studentrecord and run migrate again:\n" + '\n'.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_service_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='studentrecord',
+            constraint=models.UniqueConstraint(fields=('student', 'course', 'year', 'semester'), name='record_unique_result'),
+        ),
+    ]
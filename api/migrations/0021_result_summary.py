@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+
+
+def build_summaries(apps, schema_editor):
+    StudentRecord = apps.get_model('api', 'StudentRecord')
+    ResultSummary = apps.get_model('api', 'ResultSummary')
+    totals = (
+        StudentRecord.objects
+        .values('course', session=F('student__session'))
+        .annotate(results=Count('id'), passed=Count('id', filter=Q(gpa__gt=0)), gpa_total=Sum('gpa'))
+        .order_by()
+    )
+    ResultSummary.objects.bulk_create(
+        (ResultSummary(course_id=row['course'], session=row['session'], results=row['results'],
+                       passed=row['passed'], gpa_total=row['gpa_total']) for row in totals.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_student_record_unique_result'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session', models.CharField(max_length=20)),
+                ('results', models.IntegerField(default=0)),
+                ('passed', models.IntegerField(default=0)),
+                ('gpa_total', models.FloatField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.course')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course', 'session'), name='summary_unique_course_session')],
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
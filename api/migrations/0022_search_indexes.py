@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:52
+
+from django.db import migrations
+
+# The search indexes as first created, frozen here so later changes to api.search
+# can't change what this migration does. api.search.install recreates the current
+# ones after every migrate.
+
+USER_DOCUMENT = (
+    "coalesce(\"full_name\"::text, '') || ' ' || coalesce(\"email\"::text, '') || ' ' || "
+    "coalesce(\"student_id\"::text, '') || ' ' || coalesce(\"session\"::text, '')"
+)
+COURSE_DOCUMENT = "coalesce(\"course_code\"::text, '') || ' ' || coalesce(\"course_title\"::text, '')"
+
+POSTGRES_INSTALL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f"CREATE INDEX IF NOT EXISTS api_customuser_search_tsv_idx ON \"api_customuser\" USING gin (to_tsvector('simple'::regconfig, {USER_DOCUMENT}))",
+    f"CREATE INDEX IF NOT EXISTS api_customuser_search_trgm_idx ON \"api_customuser\" USING gin (({USER_DOCUMENT}) gin_trgm_ops)",
+    f"CREATE INDEX IF NOT EXISTS api_course_search_tsv_idx ON \"api_course\" USING gin (to_tsvector('simple'::regconfig, {COURSE_DOCUMENT}))",
+    f"CREATE INDEX IF NOT EXISTS api_course_search_trgm_idx ON \"api_course\" USING gin (({COURSE_DOCUMENT}) gin_trgm_ops)",
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS api_customuser_search_tsv_idx',
+    'DROP INDEX IF EXISTS api_customuser_search_trgm_idx',
+    'DROP INDEX IF EXISTS api_course_search_tsv_idx',
+    'DROP INDEX IF EXISTS api_course_search_trgm_idx',
+]
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_customuser_search USING fts5("
+    "full_name, email, student_id, session, content='api_customuser', content_rowid='id', prefix='1 2 3')",
+    "CREATE TRIGGER IF NOT EXISTS api_customuser_search_insert AFTER INSERT ON api_customuser BEGIN "
+    "INSERT INTO api_customuser_search(rowid, full_name, email, student_id, session) "
+    "VALUES (new.id, new.full_name, new.email, new.student_id, new.session); END",
+    "CREATE TRIGGER IF NOT EXISTS api_customuser_search_delete AFTER DELETE ON api_customuser BEGIN "
+    "INSERT INTO api_customuser_search(api_customuser_search, rowid, full_name, email, student_id, session) "
+    "VALUES ('delete', old.id, old.full_name, old.email, old.student_id, old.session); END",
+    "CREATE TRIGGER IF NOT EXISTS api_customuser_search_update AFTER UPDATE OF full_name, email, student_id, session "
+    "ON api_customuser BEGIN "
+    "INSERT INTO api_customuser_search(api_customuser_search, rowid, full_name, email, student_id, session) "
+    "VALUES ('delete', old.id, old.full_name, old.email, old.student_id, old.session); "
+    "INSERT INTO api_customuser_search(rowid, full_name, email, student_id, session) "
+    "VALUES (new.id, new.full_name, new.email, new.student_id, new.session); END",
+    "INSERT INTO api_customuser_search(api_customuser_search) VALUES ('rebuild')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_course_search USING fts5("
+    "course_code, course_title, content='api_course', content_rowid='id', prefix='1 2 3')",
+    "CREATE TRIGGER IF NOT EXISTS api_course_search_insert AFTER INSERT ON api_course BEGIN "
+    "INSERT INTO api_course_search(rowid, course_code, course_title) "
+    "VALUES (new.id, new.course_code, new.course_title); END",
+    "CREATE TRIGGER IF NOT EXISTS api_course_search_delete AFTER DELETE ON api_course BEGIN "
+    "INSERT INTO api_course_search(api_course_search, rowid, course_code, course_title) "
+    "VALUES ('delete', old.id, old.course_code, old.course_title); END",
+    "CREATE TRIGGER IF NOT EXISTS api_course_search_update AFTER UPDATE OF course_code, course_title "
+    "ON api_course BEGIN "
+    "INSERT INTO api_course_search(api_course_search, rowid, course_code, course_title) "
+    "VALUES ('delete', old.id, old.course_code, old.course_title); "
+    "INSERT INTO api_course_search(rowid, course_code, course_title) "
+    "VALUES (new.id, new.course_code, new.course_title); END",
+    "INSERT INTO api_course_search(api_course_search) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS api_customuser_search_insert',
+    'DROP TRIGGER IF EXISTS api_customuser_search_delete',
+    'DROP TRIGGER IF EXISTS api_customuser_search_update',
+    'DROP TABLE IF EXISTS api_customuser_search',
+    'DROP TRIGGER IF EXISTS api_course_search_insert',
+    'DROP TRIGGER IF EXISTS api_course_search_delete',
+    'DROP TRIGGER IF EXISTS api_course_search_update',
+    'DROP TABLE IF EXISTS api_course_search',
+]
+
+INSTALL = {'postgresql': POSTGRES_INSTALL, 'sqlite': SQLITE_INSTALL}
+UNINSTALL = {'postgresql': POSTGRES_UNINSTALL, 'sqlite': SQLITE_UNINSTALL}
+
+
+def install_search(apps, schema_editor):
+    # Other backends search without an index.
+    for statement in INSTALL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement, params=None)
+
+
+def uninstall_search(apps, schema_editor):
+    for statement in UNINSTALL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_result_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
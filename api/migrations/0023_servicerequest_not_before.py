@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicerequest',
+            name='not_before',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
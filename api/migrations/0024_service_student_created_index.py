@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_servicerequest_not_before'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='servicerequest',
+            index=models.Index(fields=['student', 'created_at', 'id'], name='service_student_created_idx'),
+        ),
+    ]
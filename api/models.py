@@ -1,6 +1,9 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
 
+from .hashing import hash_password, verify_password
+
 class Role(models.Model):
     name = models.CharField(max_length=50, unique=True)
     description = models.TextField(null=True, blank=True)
@@ -65,7 +68,27 @@ class CustomUserManager(BaseUserManager):
         return self.create_user(email, password, **extra_fields)
 
 
-class CustomUser(AbstractBaseUser, PermissionsMixin):
+class TracksLoadedValues:
+    """
+    Keeps the column values an instance was loaded or last saved with in `_loaded_values`,
+    so signal receivers can tell what a save changed without reading the row back.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields if field.attname in self.__dict__
+        }
+
+
+class CustomUser(TracksLoadedValues, AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True)
     password = models.CharField(max_length=300)
     student_id = models.IntegerField(unique=True)
@@ -78,7 +101,9 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     name_mother = models.CharField(max_length=50, null=True, blank=True)
     session = models.CharField(max_length=20)
     blood_group = models.CharField(max_length=10, null=True, blank=True)
-    user_photo = models.TextField(null=True, blank=True)
+    photo_digest = models.CharField(max_length=64, null=True, blank=True)
+    # Bumped whenever anything shown on the student's documents changes; keys the rendered-document cache.
+    documents_version = models.PositiveIntegerField(default=0)
 
     is_active = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
@@ -90,36 +115,148 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['student_id']
 
+    # Shown on the student's documents; saving a change to any of them bumps documents_version
+    DOCUMENT_FIELDS = ('email', 'student_id', 'department', 'full_name', 'session')
+
     def __str__(self):
         return str(self.student_id)
 
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # documents_version is only ever bumped in the database (see api.signals);
+            # writing back the copy loaded here could undo a concurrent bump.
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred and field.name != 'documents_version'
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    def documents_changed(self, update_fields=None):
+        """
+        Whether the save just made changed any of `DOCUMENT_FIELDS` from what was loaded.\n
+        Instances that weren't loaded from the database count as changed.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        for name in self.DOCUMENT_FIELDS:
+            attname = self._meta.get_field(name).attname
+            if update_fields is not None and name not in update_fields and attname not in update_fields:
+                continue
+            if loaded is None or attname not in loaded or loaded[attname] != getattr(self, attname):
+                return True
+        return False
+
+    def set_password(self, raw_password):
+        self.password = hash_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        # Outdated hashes are replaced on a successful login, as Django does by default.
+        valid, upgraded = verify_password(raw_password, self.password)
+        if upgraded:
+            self.password = upgraded
+            self._password = None
+            self.save(update_fields=['password'])
+        return valid
+
+    async def acheck_password(self, raw_password):
+        valid, upgraded = await sync_to_async(verify_password)(raw_password, self.password)
+        if upgraded:
+            self.password = upgraded
+            self._password = None
+            await self.asave(update_fields=['password'])
+        return valid
+
 
 class OTP(models.Model):
     email = models.EmailField()
     otp = models.CharField(max_length=6)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['email', 'created_at'], name='otp_email_created_idx'),
+            # Range scans for the expiry sweeper
+            models.Index(fields=['created_at'], name='otp_created_idx'),
+        ]
+
     def __str__(self):
         return self.email + ' - ' + self.otp
 
 
 class ServiceRequest(models.Model):
+    PENDING = 'Pending'
+    PROCESSING = 'Processing'
+    COMPLETED = 'Completed'
+    FAILED = 'Failed'
+
     student = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     request_doc = models.ForeignKey(Document, on_delete=models.CASCADE)
-    status = models.CharField(max_length=20, default='Pending')
+    status = models.CharField(max_length=20, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # A failed attempt is retried no earlier than this
+    not_before = models.DateTimeField(null=True, blank=True)
+    result_file = models.CharField(max_length=255, null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'status', 'created_at'], name='service_student_status_idx'),
+            # A student's own requests, newest first
+            models.Index(fields=['student', 'created_at', 'id'], name='service_student_created_idx'),
+            # Keyset pagination of the staff listing, with and without a status filter
+            models.Index(fields=['created_at', 'id'], name='service_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='service_status_created_idx'),
+            # Only the queue's pending rows, in claim order
+            models.Index(
+                fields=['created_at', 'id'],
+                name='service_pending_idx',
+                condition=models.Q(status='Pending'),
+            ),
+        ]
+
     def __str__(self):
-        return f"{self.student} - {self.request_type} - {self.status}"
+        return f"{self.student} - {self.request_doc} - {self.status}"
 
 
-class StudentRecord(models.Model):
+class StudentRecord(TracksLoadedValues, models.Model):
     student = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     semester = models.CharField(max_length=10)
     year = models.IntegerField()
     gpa = models.FloatField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'year', 'semester'], name='record_student_term_idx'),
+        ]
+        constraints = [
+            # One result per course per term; bulk result imports upsert on it.
+            models.UniqueConstraint(fields=['student', 'course', 'year', 'semester'], name='record_unique_result'),
+        ]
+
     def __str__(self):
         return f"{self.student} - {self.course.course_code} - {self.semester} - {self.year}"
+
+
+class ResultSummary(models.Model):
+    """
+    Running totals of the results recorded in a course by the students of one session,
+    kept up to date as results are written (see `api.analytics`).
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    session = models.CharField(max_length=20)
+    results = models.IntegerField(default=0)
+    passed = models.IntegerField(default=0)
+    gpa_total = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'session'], name='summary_unique_course_session'),
+        ]
+
+    def __str__(self):
+        return f"{self.course.course_code} - {self.session}"
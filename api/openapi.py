@@ -0,0 +1,65 @@
+import difflib
+import json
+import logging
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+from .responses import precompress
+
+logger = logging.getLogger(__name__)
+
+_documents = None
+_lock = threading.Lock()
+
+
+def generate():
+    """
+    Introspect every view and serializer into the OpenAPI schema, as the JSON text that
+    is committed to `OPENAPI_SCHEMA_PATH`.
+    """
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    # The renderer resolves lazy strings and other values plain json can't encode.
+    data = json.loads(OpenApiJsonRenderer().render(schema, renderer_context={}))
+    return json.dumps(data, indent=2, ensure_ascii=False) + '\n'
+
+
+def schema_drift():
+    """
+    A unified diff from the committed schema to the one the code generates now, empty
+    when they match.
+    """
+    path = Path(settings.OPENAPI_SCHEMA_PATH)
+    committed = path.read_text(encoding='utf-8') if path.exists() else ''
+    return ''.join(difflib.unified_diff(
+        committed.splitlines(keepends=True),
+        generate().splitlines(keepends=True),
+        fromfile=f'{path.name} (committed)',
+        tofile=f'{path.name} (generated)',
+    ))
+
+
+def get_documents():
+    """
+    The schema, pre-encoded for `encoded_response`, as `{'json': (etag, bodies),
+    'yaml': (etag, bodies)}`.\n
+    Read from the committed file once per process. Without the file the schema is
+    generated instead, still only once.
+    """
+    global _documents
+
+    with _lock:
+        if _documents is None:
+            path = Path(settings.OPENAPI_SCHEMA_PATH)
+            try:
+                text = path.read_text(encoding='utf-8')
+            except FileNotFoundError:
+                logger.warning("No OpenAPI schema at %s, generating it; run `python manage.py build_schema`", path)
+                text = generate()
+            yaml = OpenApiYamlRenderer().render(json.loads(text), renderer_context={})
+            _documents = {'json': precompress(text.encode()), 'yaml': precompress(yaml)}
+        return _documents
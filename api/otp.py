@@ -0,0 +1,97 @@
+import hmac
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.utils import timezone
+
+from . import models
+
+
+class OTPRateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Too many attempts, retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+def check_rate(scope, email, limit):
+    """
+    Count one attempt against a fixed window per `(scope, email)` in the cache.\n
+    Raises `OTPRateLimited` with the seconds left in the window once `limit` is exceeded.
+    """
+    window = settings.OTP_RATE_WINDOW
+    now = int(time.time())
+    key = f'otp-rate:{scope}:{email.lower()}:{now // window}'
+
+    cache.add(key, 0, window)
+    try:
+        attempts = cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, window)
+        attempts = 1
+
+    if attempts > limit:
+        raise OTPRateLimited(window - now % window)
+
+
+def generate_code():
+    return f'{secrets.randbelow(10 ** 6):06d}'
+
+
+def expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.OTP_TTL)
+
+
+def issue_otp(email):
+    check_rate('issue', email, settings.OTP_ISSUE_LIMIT)
+    code = generate_code()
+    models.OTP.objects.create(email=email, otp=code)
+
+    send_mail(
+        subject="Your verification code",
+        message=f"Your verification code is {code}. It expires in {settings.OTP_TTL // 60} minutes.",
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[email],
+    )
+
+
+def verify_otp(email, code):
+    """
+    Check `code` against the newest unexpired OTP for `email`.\n
+    A match consumes every OTP issued to that address. Of concurrent verifications of
+    the same code only the one that deletes it succeeds.
+    """
+    check_rate('verify', email, settings.OTP_VERIFY_LIMIT)
+
+    latest = (
+        models.OTP.objects
+        .filter(email=email, created_at__gte=expiry_cutoff())
+        .order_by('-created_at')
+        .values_list('pk', 'otp')
+        .first()
+    )
+    if latest is None or not hmac.compare_digest(latest[1].encode(), str(code).encode()):
+        return False
+
+    deleted, _ = models.OTP.objects.filter(pk=latest[0]).delete()
+    if not deleted:
+        return False
+    models.OTP.objects.filter(email=email).delete()
+    return True
+
+
+def purge_expired(batch_size):
+    """
+    Delete expired OTPs in primary-key batches so no single statement holds locks for long.\n
+    Yields the number of rows deleted per batch.
+    """
+    cutoff = expiry_cutoff()
+    while True:
+        pks = list(models.OTP.objects.filter(created_at__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        deleted, _ = models.OTP.objects.filter(pk__in=pks).delete()
+        yield deleted
@@ -0,0 +1,110 @@
+import codecs
+import csv
+
+from django.conf import settings
+from django.db import transaction
+
+from . import models
+from . import serializers
+from .hashing import hash_passwords
+
+
+class UnreadableSheet(ValueError):
+    """
+    An uploaded sheet that can't be parsed past some row; the message names the row.
+    """
+
+
+def iter_csv_rows(stream):
+    """
+    Yield CSV rows from a byte stream as dicts, one line at a time.\n
+    Empty cells are dropped so optional fields fall back to their defaults. Raises
+    `UnreadableSheet` at the first row that isn't UTF-8 or isn't valid CSV.
+    """
+    lines = codecs.iterdecode(iter(stream.readline, b''), 'utf-8-sig')
+    index = 0
+    try:
+        for index, row in enumerate(csv.DictReader(lines), start=1):
+            yield {key: value for key, value in row.items() if key and value not in ('', None)}
+    except UnicodeDecodeError as exc:
+        raise UnreadableSheet(f'Row {index + 1}: CSV must be UTF-8') from exc
+    except csv.Error as exc:
+        raise UnreadableSheet(f'Row {index + 1}: {exc}') from exc
+
+
+def import_users(rows):
+    """
+    Validate and insert a batch of registrations.\n
+    Returns `(created, errors)` where `errors` lists `{'row': n, 'errors': {...}}`
+    for every rejected row (1-based). Valid rows are inserted even when others fail.
+    """
+    role_ids = set(models.Role.objects.values_list('id', flat=True))
+    department_ids = set(models.Department.objects.values_list('id', flat=True))
+
+    errors = []
+    candidates = []
+    seen_emails = set()
+    seen_student_ids = set()
+
+    for index, row in enumerate(rows, start=1):
+        serializer = serializers.CustomUserSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({'row': index, 'errors': serializer.errors})
+            continue
+
+        data = serializer.validated_data
+        row_errors = {}
+
+        if data['role'] not in role_ids:
+            row_errors['role'] = ['Invalid role ID']
+        if data['department'] not in department_ids:
+            row_errors['department'] = ['Invalid department ID']
+        if data['email'] in seen_emails:
+            row_errors['email'] = ['Email is repeated in this import']
+        if data['student_id'] in seen_student_ids:
+            row_errors['student_id'] = ['Student ID is repeated in this import']
+
+        seen_emails.add(data['email'])
+        seen_student_ids.add(data['student_id'])
+
+        if row_errors:
+            errors.append({'row': index, 'errors': row_errors})
+        else:
+            candidates.append((index, data))
+
+    existing_emails = set(
+        models.CustomUser.objects
+        .filter(email__in=[data['email'] for _, data in candidates])
+        .values_list('email', flat=True)
+    )
+    existing_student_ids = set(
+        models.CustomUser.objects
+        .filter(student_id__in=[data['student_id'] for _, data in candidates])
+        .values_list('student_id', flat=True)
+    )
+
+    accepted = []
+    for index, data in candidates:
+        row_errors = {}
+        if data['email'] in existing_emails:
+            row_errors['email'] = ['Email already exists']
+        if data['student_id'] in existing_student_ids:
+            row_errors['student_id'] = ['Student ID already exists']
+
+        if row_errors:
+            errors.append({'row': index, 'errors': row_errors})
+        else:
+            accepted.append(data)
+
+    hashed = hash_passwords([data['password'] for data in accepted])
+    users = []
+    for data, password in zip(accepted, hashed):
+        user = serializers.CustomUserSerializer.build_user(data)
+        user.password = password
+        users.append(user)
+
+    with transaction.atomic():
+        models.CustomUser.objects.bulk_create(users, batch_size=settings.BULK_REGISTER_CHUNK_SIZE)
+
+    errors.sort(key=lambda error: error['row'])
+    return len(users), errors
@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class EventStreamRenderer(JSONRenderer):
+    # Lets views accept `Accept: text/event-stream`; error bodies are still rendered as JSON.
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range `Range` header into an inclusive `(start, end)` pair.\n
+    Returns `None` when the header is absent or not something we serve partially
+    (multiple ranges, other units) and raises `ValueError` when it is unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        return None
+
+    if not start:
+        length = int(end)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def read_slice(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def is_not_modified(request, quoted_etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    return bool(if_none_match) and (if_none_match.strip() == '*' or quoted_etag in parse_etags(if_none_match))
+
+
+def not_modified_response(quoted_etag, cache_control):
+    response = HttpResponse(status=304)
+    response['ETag'] = quoted_etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def accepted_encodings(request):
+    """
+    The content codings named in `Accept-Encoding`, minus any refused with `q=0`.
+    """
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        q = params.strip().lower().removeprefix('q=')
+        try:
+            refused = bool(params) and float(q) == 0
+        except ValueError:
+            refused = False
+        if coding and not refused:
+            accepted.add(coding)
+    return accepted
+
+
+def precompress(body):
+    """
+    Compress `body` once for `encoded_response`. Returns `(etag, bodies)`, the ETag
+    derived from the content and the encoded copies by content coding, best first.
+    """
+    bodies = {}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(body)
+    bodies['gzip'] = gzip.compress(body, mtime=0)
+    bodies['identity'] = body
+    return hashlib.sha256(body).hexdigest()[:32], bodies
+
+
+def encoded_response(request, bodies, content_type, etag, cache_control):
+    """
+    Serve one of several pre-encoded copies of the same body.\n
+    `bodies` maps a content coding (`identity`, `gzip`, `br`) to bytes, in order of
+    preference. Each coding gets its own strong ETag, as the bytes differ.
+    """
+    accepted = accepted_encodings(request)
+    coding = next((c for c in bodies if c != 'identity' and c in accepted), 'identity')
+    quoted_etag = f'"{etag}"' if coding == 'identity' else f'"{etag}-{coding}"'
+
+    if is_not_modified(request, quoted_etag):
+        response = not_modified_response(quoted_etag, cache_control)
+    else:
+        response = HttpResponse(bodies[coding], content_type=content_type)
+        if coding != 'identity':
+            response['Content-Encoding'] = coding
+        response['ETag'] = quoted_etag
+        response['Cache-Control'] = cache_control
+
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def file_response(request, path, content_type, etag, cache_control='private, max-age=31536000, immutable'):
+    """
+    Serve a file from disk with conditional (`If-None-Match`) and `Range` support.\n
+    Full responses go through `FileResponse`, so the WSGI server's `file_wrapper`
+    (sendfile) does the copy; partial responses stream only the requested slice.
+    """
+    quoted_etag = f'"{etag}"'
+
+    if is_not_modified(request, quoted_etag):
+        return not_modified_response(quoted_etag, cache_control)
+
+    size = os.path.getsize(path)
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range.strip() != quoted_etag:
+        range_header = None
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(read_slice(path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = quoted_etag
+    response['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,160 @@
+import itertools
+from zipfile import BadZipFile
+
+from django.conf import settings
+from django.db import transaction
+
+from . import models
+from .analytics import count_upserted_results
+from .registration import UnreadableSheet
+from .signals import bump_documents_version
+
+COLUMNS = ('student_id', 'course_code', 'year', 'semester', 'gpa')
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def iter_xlsx_rows(file):
+    """
+    Yield the rows of an XLSX workbook's first sheet as dicts keyed by its header row.\n
+    The workbook is opened read-only, so rows are parsed as they are read instead of
+    loading the whole sheet. `file` must be seekable. Raises `UnreadableSheet` when it
+    isn't a workbook, or stops being readable part way.
+    """
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (BadZipFile, InvalidFileException, KeyError) as exc:
+        # KeyError: a zip archive without the workbook's parts.
+        raise UnreadableSheet('Not a readable XLSX workbook') from exc
+
+    index = 0
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else None for cell in next(rows, ())]
+        for index, values in enumerate(rows, start=1):
+            yield {key: value for key, value in zip(header, values) if key and value not in ('', None)}
+    except (BadZipFile, KeyError) as exc:
+        raise UnreadableSheet(f'Row {index + 1}: not a readable XLSX workbook') from exc
+    finally:
+        workbook.close()
+
+
+def parse_result(row, students, courses):
+    """
+    Turn a sheet row into a `StudentRecord`, or a dict of errors per column.
+    """
+    errors = {}
+    for column in COLUMNS:
+        if column not in row:
+            errors[column] = ['This field is required.']
+    if errors:
+        return None, errors
+
+    try:
+        student_pk = students.get(int(row['student_id']))
+    except (TypeError, ValueError):
+        student_pk = None
+    if student_pk is None:
+        errors['student_id'] = ['Unknown student ID']
+
+    course_pk = courses.get(str(row['course_code']).strip())
+    if course_pk is None:
+        errors['course_code'] = ['Unknown course code']
+
+    try:
+        year = int(row['year'])
+    except (TypeError, ValueError):
+        errors['year'] = ['A valid integer is required.']
+
+    semester = str(row['semester']).strip()
+    if not semester or len(semester) > 10:
+        errors['semester'] = ['Expected 1 to 10 characters.']
+
+    try:
+        gpa = float(row['gpa'])
+        if not 0 <= gpa <= 4:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors['gpa'] = ['Expected a number between 0 and 4.']
+
+    if errors:
+        return None, errors
+    return models.StudentRecord(student_id=student_pk, course_id=course_pk, year=year, semester=semester, gpa=gpa), None
+
+
+def write_results(records):
+    # Later rows for the same result win, within a chunk as across chunks.
+    unique = {(r.student_id, r.course_id, r.year, r.semester): r for r in records}
+    with transaction.atomic():
+        changes = count_upserted_results(unique)
+        models.StudentRecord.objects.bulk_create(
+            unique.values(),
+            update_conflicts=True,
+            unique_fields=['student', 'course', 'year', 'semester'],
+            update_fields=['gpa'],
+        )
+        # Bulk writes send no signals, so update the summaries and invalidate the
+        # students' documents here.
+        changes.save()
+        bump_documents_version(models.CustomUser.objects.filter(pk__in={r.student_id for r in records}))
+    return len(unique)
+
+
+def read_chunk(rows, size):
+    """
+    Up to `size` of `rows`, and the `UnreadableSheet` that cut them short, if any.
+    """
+    chunk = []
+    try:
+        for row in itertools.islice(rows, size):
+            chunk.append(row)
+    except UnreadableSheet as exc:
+        return chunk, exc
+    return chunk, None
+
+
+def import_results(rows, chunk_size=None, progress=None, max_errors=None):
+    """
+    Upsert result rows (`student_id`, `course_code`, `year`, `semester`, `gpa`) into
+    `StudentRecord`, one transaction per chunk.\n
+    Students and courses are resolved through maps built once up front. `progress` is
+    called after every chunk with the running summary. Returns `{'rows', 'written',
+    'error_count', 'errors'}`, where `errors` lists up to `max_errors` of
+    `{'row': n, 'errors': {...}}` (1-based, header excluded).\n
+    A sheet that can't be read to the end stops the import at that row; what was read
+    before it stays written, and the summary's `detail` says where it stopped.
+    """
+    chunk_size = chunk_size or settings.RESULTS_IMPORT_CHUNK_SIZE
+    max_errors = settings.RESULTS_IMPORT_MAX_ERRORS if max_errors is None else max_errors
+    students = dict(models.CustomUser.objects.values_list('student_id', 'pk').iterator(chunk_size=10000))
+    courses = dict(models.Course.objects.values_list('course_code', 'pk'))
+
+    summary = {'rows': 0, 'written': 0, 'error_count': 0, 'errors': []}
+    numbered = enumerate(rows, start=1)
+
+    unreadable = None
+    while not unreadable:
+        chunk, unreadable = read_chunk(numbered, chunk_size)
+        if not chunk:
+            break
+        records = []
+        for index, row in chunk:
+            record, errors = parse_result(row, students, courses)
+            if errors:
+                summary['error_count'] += 1
+                if len(summary['errors']) < max_errors:
+                    summary['errors'].append({'row': index, 'errors': errors})
+            else:
+                records.append(record)
+
+        if records:
+            summary['written'] += write_results(records)
+        summary['rows'] += len(chunk)
+        if progress:
+            progress(summary)
+
+    if unreadable:
+        summary['detail'] = str(unreadable)
+    return summary
@@ -0,0 +1,190 @@
+import re
+from dataclasses import dataclass
+
+from django.db import connection
+from django.db.models import Q
+
+from . import models
+
+TOKEN = re.compile(r'\w+')
+
+# Best matches the admin search box keeps. A one-letter prefix can match most of the
+# table, and a changelist filtered on that many ids is slower than refining the search.
+RANK_CANDIDATES = 1000
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    """
+    A full-text index over some of a model's columns.\n
+    On Postgres it is a pair of GIN expression indexes on the table itself, a `tsvector`
+    one for ranked word and prefix matches and a trigram one for substring matches, so
+    there is nothing to keep in sync. On SQLite it is an FTS5 table mirroring the columns,
+    kept in sync by triggers.
+    """
+    model: type
+    columns: tuple
+    # Output field -> column, in response order
+    fields: dict
+
+    @property
+    def table(self):
+        return self.model._meta.db_table
+
+    @property
+    def fts_table(self):
+        return f'{self.table}_search'
+
+    @property
+    def document(self):
+        # The exact expression the Postgres indexes are built on; queries must repeat it.
+        return " || ' ' || ".join(f"coalesce({quote(column)}::text, '')" for column in self.columns)
+
+
+def quote(name):
+    return connection.ops.quote_name(name)
+
+
+INDEXES = {
+    'students': SearchIndex(
+        model=models.CustomUser,
+        columns=('full_name', 'email', 'student_id', 'session'),
+        fields={
+            'id': 'id',
+            'student_id': 'student_id',
+            'email': 'email',
+            'full_name': 'full_name',
+            'session': 'session',
+            'department': 'department_id',
+        },
+    ),
+    'courses': SearchIndex(
+        model=models.Course,
+        columns=('course_code', 'course_title'),
+        fields={
+            'id': 'id',
+            'course_code': 'course_code',
+            'course_title': 'course_title',
+            'department': 'dept_name_id',
+        },
+    ),
+}
+
+
+def postgres_statements(index):
+    return [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f"CREATE INDEX IF NOT EXISTS {index.table}_search_tsv_idx ON {quote(index.table)} "
+        f"USING gin (to_tsvector('simple'::regconfig, {index.document}))",
+        f"CREATE INDEX IF NOT EXISTS {index.table}_search_trgm_idx ON {quote(index.table)} "
+        f"USING gin (({index.document}) gin_trgm_ops)",
+    ]
+
+
+def sqlite_statements(index):
+    columns = ', '.join(index.columns)
+    new = ', '.join(f'new.{column}' for column in index.columns)
+    old = ', '.join(f'old.{column}' for column in index.columns)
+    fts, table = index.fts_table, index.table
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', content_rowid='id', prefix='1 2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new}); END",
+    ]
+
+
+def install(db):
+    """
+    Create the search indexes on the `db` connection, where missing.\n
+    Safe to run repeatedly. On SQLite, migrations that rebuild a table drop its triggers,
+    so the FTS5 tables are repopulated whenever their triggers had to be recreated.
+    """
+    with db.cursor() as cursor:
+        for index in INDEXES.values():
+            if db.vendor == 'postgresql':
+                for statement in postgres_statements(index):
+                    cursor.execute(statement)
+            elif db.vendor == 'sqlite':
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = %s", [f'{index.fts_table}_insert'])
+                in_sync = cursor.fetchone() is not None
+                for statement in sqlite_statements(index):
+                    cursor.execute(statement)
+                if not in_sync:
+                    cursor.execute(f"INSERT INTO {index.fts_table}({index.fts_table}) VALUES ('rebuild')")
+
+
+def uninstall(db):
+    with db.cursor() as cursor:
+        for index in INDEXES.values():
+            if db.vendor == 'postgresql':
+                cursor.execute(f'DROP INDEX IF EXISTS {index.table}_search_tsv_idx')
+                cursor.execute(f'DROP INDEX IF EXISTS {index.table}_search_trgm_idx')
+            elif db.vendor == 'sqlite':
+                for suffix in ('insert', 'delete', 'update'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {index.fts_table}_{suffix}')
+                cursor.execute(f'DROP TABLE IF EXISTS {index.fts_table}')
+
+
+def search(name, text, limit=20):
+    """
+    Up to `limit` rows of the `name` index matching `text`, best first.\n
+    Every word of `text` must match the start of a word in the row, so partial input
+    ("ali kha", "2001") works for typeahead. On Postgres a substring match of the whole
+    text also counts, which catches partial emails.
+    """
+    index = INDEXES[name]
+    tokens = TOKEN.findall(text.lower())
+    if not tokens:
+        return []
+
+    if connection.vendor == 'postgresql':
+        sql, params = postgres_query(index, tokens, text.strip(), limit)
+    elif connection.vendor == 'sqlite':
+        sql, params = sqlite_query(index, tokens, limit)
+    else:
+        return fallback_search(index, tokens, limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [dict(zip(index.fields, row)) for row in cursor.fetchall()]
+
+
+def postgres_query(index, tokens, text, limit):
+    table = quote(index.table)
+    columns = ', '.join(quote(column) for column in index.fields.values())
+    vector = f"to_tsvector('simple'::regconfig, {index.document})"
+    query = ' & '.join(f'{token}:*' for token in tokens)
+    condition, params = f"{vector} @@ to_tsquery('simple', %s)", [query]
+    # Trigrams need three characters; shorter patterns would scan the whole index.
+    if len(text) >= 3:
+        condition += f" OR ({index.document}) ILIKE %s"
+        params.append('%{}%'.format(re.sub(r'([\\%_])', r'\\\1', text)))
+    sql = (
+        f"SELECT {columns} FROM {table} WHERE {condition} "
+        f"ORDER BY ts_rank({vector}, to_tsquery('simple', %s)) DESC, {quote('id')} LIMIT %s"
+    )
+    return sql, params + [query, limit]
+
+
+def sqlite_query(index, tokens, limit):
+    columns = ', '.join(f'{index.table}.{column}' for column in index.fields.values())
+    sql = (
+        f"SELECT {columns} FROM {index.fts_table} JOIN {index.table} ON {index.table}.id = {index.fts_table}.rowid "
+        f"WHERE {index.fts_table} MATCH %s ORDER BY {index.fts_table}.rank, {index.table}.id LIMIT %s"
+    )
+    return sql, [' '.join(f'"{token}"*' for token in tokens), limit]
+
+
+def fallback_search(index, tokens, limit):
+    rows = index.model.objects.order_by('pk')
+    for token in tokens:
+        matches = Q()
+        for column in index.columns:
+            matches |= Q(**{f'{column}__icontains': token})
+        rows = rows.filter(matches)
+    return [dict(zip(index.fields, row)) for row in rows.values_list(*index.fields.values())[:limit]]
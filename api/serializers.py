@@ -1,5 +1,10 @@
+from functools import lru_cache
+from operator import attrgetter
+
+from django.urls import reverse
 from rest_framework import serializers
 from . import models
+from .metrics import timed
 
 
 class CustomUserSerializer(serializers.Serializer):
@@ -15,10 +20,35 @@ class CustomUserSerializer(serializers.Serializer):
     name_mother = serializers.CharField(max_length=50, required=False, allow_blank=True)
     session = serializers.CharField(max_length=20)
     blood_group = serializers.CharField(max_length=10, required=False, allow_blank=True)
-    user_photo = serializers.CharField(required=False, allow_blank=True)
+    user_photo = serializers.CharField(read_only=True)
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.represent = compile_representation(fields or USER_FIELDS)
+
+    @staticmethod
+    def select_fields(param):
+        """
+        Turn a `?fields=email,student_id` value into the field tuple to pass as `fields`.
+        Raises `ValueError` naming any unknown field.
+        """
+        if not param:
+            return None
+        requested = {name.strip() for name in param.split(',') if name.strip()}
+        unknown = requested.difference(USER_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return tuple(name for name in USER_FIELDS if name in requested)
 
     def create(self, validated_data):
-        user = models.CustomUser(
+        user = self.build_user(validated_data)
+        user.set_password(validated_data.get('password', ""))
+        user.save()
+        return user
+
+    @staticmethod
+    def build_user(validated_data):
+        return models.CustomUser(
             email=validated_data.get('email', ""),
             student_id=validated_data.get('student_id', ""),
             department_id=validated_data.get('department', ""),
@@ -29,46 +59,136 @@ class CustomUserSerializer(serializers.Serializer):
             name_father=validated_data.get('name_father', ""),
             name_mother=validated_data.get('name_mother', ""),
             session=validated_data.get('session', ""),
-            blood_group=validated_data.get('blood_group', ""),
-            user_photo=validated_data.get('user_photo', "")
+            blood_group=validated_data.get('blood_group', "")
         )
-        user.set_password(validated_data.get('password', ""))
-        user.save()
-        return user
     
     def update(self, instance, validated_data):
-        instance.email = validated_data.get('email', instance.email)
-        instance.student_id = validated_data.get('student_id', instance.student_id)
-        instance.department_id = validated_data.get('department', instance.department)
-        instance.mobile_number = validated_data.get('mobile_number', instance.mobile_number)
-        instance.date_of_birth = validated_data.get('date_of_birth', instance.date_of_birth)
-        instance.role_id = validated_data.get('role', instance.role_id)
-        instance.full_name = validated_data.get('full_name', instance.full_name)
-        instance.name_father = validated_data.get('name_father', instance.name_father)
-        instance.name_mother = validated_data.get('name_mother', instance.name_mother)
-        instance.session = validated_data.get('session', instance.session)
-        instance.blood_group = validated_data.get('blood_group', instance.blood_group)
-        instance.user_photo = validated_data.get('user_photo', instance.user_photo)
+        changed = self.apply(instance, validated_data)
+        if changed:
+            instance.save(update_fields=changed)
+        return instance
+
+    @staticmethod
+    def apply(instance, validated_data):
+        """
+        Copy the validated values onto `instance` and return the columns that actually
+        changed, ready for `save(update_fields=...)`. Returns an empty list for a no-op.
+        """
+        changed = []
+        for name, attname in WRITABLE_COLUMNS.items():
+            if name in validated_data and getattr(instance, attname) != validated_data[name]:
+                setattr(instance, attname, validated_data[name])
+                changed.append(attname)
 
         if 'password' in validated_data:
             instance.set_password(validated_data['password'])
-        
-        instance.save()
-        return instance
+            changed.append('password')
 
-    
+        if changed:
+            changed.append('updated_at')
+        return changed
+
+    @timed('serialize')
+    def to_representation(self, instance):
+        return self.represent(instance)
+
+
+def photo_url(user):
+    if not user.photo_digest:
+        return None
+    return reverse('user-photo', args=[user.photo_digest])
+
+
+# Serializer field -> model column for the fields a user may change
+WRITABLE_COLUMNS = {
+    'email': 'email',
+    'student_id': 'student_id',
+    'department': 'department_id',
+    'mobile_number': 'mobile_number',
+    'date_of_birth': 'date_of_birth',
+    'role': 'role_id',
+    'full_name': 'full_name',
+    'name_father': 'name_father',
+    'name_mother': 'name_mother',
+    'session': 'session',
+    'blood_group': 'blood_group',
+}
+
+# Output field -> getter, in response order
+USER_GETTERS = {name: attrgetter(attname) for name, attname in WRITABLE_COLUMNS.items()}
+USER_GETTERS['user_photo'] = photo_url
+USER_FIELDS = tuple(USER_GETTERS)
+
+
+@lru_cache(maxsize=64)
+def compile_representation(fields):
+    """
+    Build the function rendering a user with just `fields`, once per field set.
+    """
+    getters = tuple((name, USER_GETTERS[name]) for name in fields)
+
+    def represent(instance):
+        return {name: get(instance) for name, get in getters}
+
+    return represent
+
+
+class ServiceRequestSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    document = serializers.CharField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    status_url = serializers.CharField(read_only=True)
+    document_url = serializers.CharField(read_only=True, allow_null=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+
+    @timed('serialize')
+    def to_representation(self, instance):
+        completed = instance.status == models.ServiceRequest.COMPLETED
+        return {
+            'id' : instance.id,
+            'document' : instance.request_doc.name,
+            'status' : instance.status,
+            'status_url' : reverse('service-detail', args=[instance.id]),
+            'document_url' : reverse('service-document', args=[instance.id]) if completed else None,
+            'created_at' : instance.created_at,
+            'updated_at' : instance.updated_at
+        }
+
+
+class OTPRequestSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+
+
+class OTPVerifySerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    otp = serializers.RegexField(r'^\d{6}$')
+
+
+class StaffServiceRequestSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    student = serializers.DictField(read_only=True)
+    document = serializers.CharField(read_only=True)
+    status = serializers.CharField(read_only=True)
+    attempts = serializers.IntegerField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+    updated_at = serializers.DateTimeField(read_only=True)
+
+    @timed('serialize')
     def to_representation(self, instance):
+        student = instance.student
         return {
-            'email' : instance.email,
-            'student_id' : instance.student_id,
-            'department' : instance.department_id,
-            'mobile_number' : instance.mobile_number,
-            'date_of_birth' : instance.date_of_birth,
-            'role' : instance.role_id,
-            'full_name' : instance.full_name,
-            'name_father' : instance.name_father,
-            'name_mother' : instance.name_mother,
-            'session' : instance.session,
-            'blood_group' : instance.blood_group,
-            'user_photo' : instance.user_photo
+            'id' : instance.id,
+            'student' : {
+                'id' : student.id,
+                'student_id' : student.student_id,
+                'email' : student.email,
+                'full_name' : student.full_name,
+                'department' : student.department_id
+            },
+            'document' : instance.request_doc.name,
+            'status' : instance.status,
+            'attempts' : instance.attempts,
+            'created_at' : instance.created_at,
+            'updated_at' : instance.updated_at
         }
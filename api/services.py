@@ -0,0 +1,239 @@
+import logging
+import multiprocessing
+from datetime import timedelta
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import models
+from .artifacts import get_artifact_cache, link_or_copy
+from .documents import get_renderer
+from .events import notify_status
+from .worker import worker_main
+
+logger = logging.getLogger(__name__)
+
+
+def documents_version(student_id):
+    return models.CustomUser.objects.filter(pk=student_id).values_list('documents_version', flat=True).get()
+
+
+async def adocuments_version(student_id):
+    return await models.CustomUser.objects.filter(pk=student_id).values_list('documents_version', flat=True).aget()
+
+
+def cached_rendering(document, student_id, version):
+    if get_renderer(document) is None:
+        return None
+    cache = get_artifact_cache()
+    return cache.get(cache.key(document.name, student_id, version, timezone.localdate()))
+
+
+def complete_from_cache(student, document, cached):
+    """
+    A service request completed with the `cached` rendering, or None if the cache
+    evicted it since it was looked up.
+    """
+    try:
+        with transaction.atomic():
+            service_request = models.ServiceRequest.objects.create(
+                student=student,
+                request_doc=document,
+                status=models.ServiceRequest.COMPLETED,
+            )
+            service_request.result_file = f'{service_request.pk}.html'
+            link_or_copy(cached, document_path(service_request))
+            service_request.save(update_fields=['result_file'])
+    except FileNotFoundError:
+        return None
+    return service_request
+
+
+def enqueue(student, document):
+    """
+    Create a service request. When an up-to-date rendering is already cached the request
+    is completed on the spot instead of going through the workers.
+    """
+    cached = cached_rendering(document, student.pk, documents_version(student.pk))
+    service_request = cached and complete_from_cache(student, document, cached)
+    if service_request:
+        return service_request
+    return models.ServiceRequest.objects.create(student=student, request_doc=document)
+
+
+async def aenqueue(student, document):
+    # The artifact cache lookup stats and touches files; keep it off the event loop.
+    cached = await sync_to_async(cached_rendering)(document, student.pk, await adocuments_version(student.pk))
+    service_request = cached and await sync_to_async(complete_from_cache)(student, document, cached)
+    if service_request:
+        return service_request
+    return await models.ServiceRequest.objects.acreate(student=student, request_doc=document)
+
+
+def document_root():
+    return Path(settings.DOCUMENT_STORAGE_ROOT)
+
+
+def document_path(service_request):
+    return document_root() / service_request.result_file
+
+
+def load(pk):
+    return models.ServiceRequest.objects.select_related('student__department', 'request_doc').get(pk=pk)
+
+
+def mark_claimed(queryset):
+    now = timezone.now()
+    return queryset.update(
+        status=models.ServiceRequest.PROCESSING,
+        claimed_at=now,
+        attempts=F('attempts') + 1,
+        updated_at=now,
+    )
+
+
+def retry_at(attempts):
+    return timezone.now() + timedelta(seconds=settings.SERVICE_RETRY_BACKOFF * 2 ** max(attempts - 1, 0))
+
+
+def claim_next():
+    """
+    Claim the oldest pending request that is not backing off and mark it as processing.\n
+    On backends with `SKIP LOCKED` (Postgres) competing workers never wait on each other's
+    rows. Elsewhere (SQLite) a row is claimed by a compare-and-set on its status, so only
+    one worker's `UPDATE` wins.
+    """
+    pending = models.ServiceRequest.objects.filter(
+        Q(not_before__isnull=True) | Q(not_before__lte=timezone.now()),
+        status=models.ServiceRequest.PENDING,
+    ).order_by('created_at', 'id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pk = pending.select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if pk is None:
+                return None
+            mark_claimed(models.ServiceRequest.objects.filter(pk=pk))
+            notify_status(pk, models.ServiceRequest.PROCESSING)
+        return load(pk)
+
+    for pk in pending.values_list('pk', flat=True)[:10]:
+        if mark_claimed(models.ServiceRequest.objects.filter(pk=pk, status=models.ServiceRequest.PENDING)):
+            notify_status(pk, models.ServiceRequest.PROCESSING)
+            return load(pk)
+    return None
+
+
+def retry_or_fail(queryset, attempts, error):
+    """
+    Put a claimed request back in the queue behind its backoff, or fail it once it has
+    used `SERVICE_MAX_ATTEMPTS` claims. Returns the new status, or None when `queryset`
+    no longer matches (another worker got there first).
+    """
+    if attempts < settings.SERVICE_MAX_ATTEMPTS:
+        new_status, not_before = models.ServiceRequest.PENDING, retry_at(attempts)
+    else:
+        new_status, not_before = models.ServiceRequest.FAILED, None
+    if not queryset.update(status=new_status, claimed_at=None, not_before=not_before, error=error, updated_at=timezone.now()):
+        return None
+    return new_status
+
+
+def requeue_stale():
+    """
+    Return requests whose worker died mid-job to the queue, or fail them when that was
+    their last attempt. Each claim already counted as an attempt, so a request that keeps
+    killing its worker is given up on like one that keeps raising. Returns how many
+    were requeued or failed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.SERVICE_CLAIM_TIMEOUT)
+    stale = models.ServiceRequest.objects.filter(status=models.ServiceRequest.PROCESSING, claimed_at__lt=cutoff)
+    changed = 0
+    for pk, attempts in stale.values_list('pk', 'attempts'):
+        # Only while still stale, so a worker finishing the job meanwhile wins.
+        new_status = retry_or_fail(stale.filter(pk=pk), attempts, 'Worker stopped before finishing')
+        if new_status:
+            notify_status(pk, new_status)
+            changed += 1
+    return changed
+
+
+def process(service_request):
+    """
+    Render a claimed request and record the outcome, as long as the claim still holds.
+    One that outlived `SERVICE_CLAIM_TIMEOUT` may have been requeued and claimed again;
+    the newer claim's outcome is the one kept.
+    """
+    renderer = get_renderer(service_request.request_doc)
+    queryset = models.ServiceRequest.objects.filter(
+        pk=service_request.pk,
+        status=models.ServiceRequest.PROCESSING,
+        attempts=service_request.attempts,
+        claimed_at=service_request.claimed_at,
+    )
+
+    if renderer is None:
+        if queryset.update(status=models.ServiceRequest.FAILED, error='Unsupported document type', updated_at=timezone.now()):
+            notify_status(service_request.pk, models.ServiceRequest.FAILED)
+        return
+
+    cache = get_artifact_cache()
+    student = service_request.student
+    # One date for both, so the cached copy is keyed by the date printed on it.
+    issued_on = timezone.localdate()
+    key = cache.key(service_request.request_doc.name, student.pk, student.documents_version, issued_on)
+    name = f'{service_request.pk}.html'
+
+    try:
+        rendered = cache.get(key) or cache.put(key, renderer(service_request, issued_on))
+        link_or_copy(rendered, document_root() / name)
+    except Exception as exc:
+        logger.exception("Service request %s failed", service_request.pk)
+        new_status = retry_or_fail(queryset, service_request.attempts, str(exc))
+        if new_status:
+            notify_status(service_request.pk, new_status)
+        return
+
+    if not queryset.update(status=models.ServiceRequest.COMPLETED, result_file=name, error=None, updated_at=timezone.now()):
+        logger.warning("Service request %s was claimed again before attempt %s finished", service_request.pk, service_request.attempts)
+        return
+    notify_status(service_request.pk, models.ServiceRequest.COMPLETED)
+
+
+def work(stop_event, poll_interval):
+    while not stop_event.is_set():
+        close_old_connections()
+        service_request = claim_next()
+        if service_request is None:
+            requeue_stale()
+            stop_event.wait(poll_interval)
+            continue
+        process(service_request)
+
+
+def run_workers(count, poll_interval):
+    """
+    Run `count` worker processes until interrupted.\n
+    Processes are spawned rather than forked so none of them inherits the parent's
+    database connection.
+    """
+    context = multiprocessing.get_context('spawn')
+    stop_event = context.Event()
+    workers = [
+        context.Process(target=worker_main, args=(stop_event, poll_interval), name=f'service-worker-{n}')
+        for n in range(count)
+    ]
+
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        stop_event.set()
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,117 @@
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.backends.signals import connection_created
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from . import models
+from .analytics import SummaryChanges, move_student_results, session_of
+from .authentication import bump_user_version
+from .catalog import bump_version as bump_catalog_version
+from .metrics import install_query_tracking
+from .search import install as install_search
+
+
+@receiver(post_save, sender=models.CustomUser)
+@receiver(post_delete, sender=models.CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Bump after commit so a concurrent request can't re-cache the pre-save row
+    # under the new version.
+    user_id = instance.pk
+    transaction.on_commit(lambda: bump_user_version(user_id))
+
+
+def bump_documents_version(students):
+    students.update(documents_version=F('documents_version') + 1)
+
+
+@receiver(post_save, sender=models.CustomUser)
+def invalidate_user_documents(sender, instance, created, update_fields=None, **kwargs):
+    # A new student has nothing rendered yet.
+    if created or not instance.documents_changed(update_fields):
+        return
+    bump_documents_version(models.CustomUser.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=models.CustomUser)
+def move_counted_results(sender, instance, created, update_fields=None, **kwargs):
+    # The summaries count each result under its student's session.
+    old_session = getattr(instance, '_loaded_values', {}).get('session')
+    if created or old_session is None or old_session == instance.session:
+        return
+    if update_fields is not None and 'session' not in update_fields:
+        return
+    move_student_results(instance.pk, old_session, instance.session)
+
+
+@receiver(post_save, sender=models.StudentRecord)
+@receiver(post_delete, sender=models.StudentRecord)
+def invalidate_record_documents(sender, instance, **kwargs):
+    bump_documents_version(models.CustomUser.objects.filter(pk=instance.student_id))
+
+
+@receiver(pre_save, sender=models.StudentRecord)
+def remember_counted_result(sender, instance, **kwargs):
+    # The stored row's (course, student, gpa), to count out after the save. Rows loaded
+    # through the ORM remember them; only others are read back.
+    instance.counted_result = None
+    if instance._state.adding:
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    if {'course_id', 'student_id', 'gpa'} <= loaded.keys():
+        instance.counted_result = (loaded['course_id'], loaded['student_id'], loaded['gpa'])
+    else:
+        instance.counted_result = (
+            models.StudentRecord.objects.filter(pk=instance.pk).values_list('course_id', 'student_id', 'gpa').first()
+        )
+
+
+@receiver(post_save, sender=models.StudentRecord)
+def count_saved_result(sender, instance, **kwargs):
+    changes = SummaryChanges()
+    session = session_of(instance)
+    if getattr(instance, 'counted_result', None):
+        course_id, student_id, gpa = instance.counted_result
+        old_session = session
+        if student_id != instance.student_id:
+            old_session = models.CustomUser.objects.filter(pk=student_id).values_list('session', flat=True).first()
+        changes.remove(course_id, old_session, gpa)
+    changes.add(instance.course_id, session, instance.gpa)
+    changes.save()
+
+
+@receiver(post_delete, sender=models.StudentRecord)
+def count_deleted_result(sender, instance, **kwargs):
+    changes = SummaryChanges()
+    changes.remove(instance.course_id, session_of(instance), instance.gpa)
+    changes.save()
+
+
+@receiver(post_save, sender=models.Course)
+def invalidate_course_documents(sender, instance, created, **kwargs):
+    if not created:
+        bump_documents_version(models.CustomUser.objects.filter(studentrecord__course=instance))
+
+
+@receiver([post_save, post_delete], sender=models.Role)
+@receiver([post_save, post_delete], sender=models.Faculty)
+@receiver([post_save, post_delete], sender=models.Department)
+@receiver([post_save, post_delete], sender=models.Course)
+@receiver([post_save, post_delete], sender=models.Document)
+def invalidate_catalog(sender, **kwargs):
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(connection_created)
+def track_connection_queries(sender, connection, **kwargs):
+    install_query_tracking(connection)
+
+
+@receiver(post_migrate)
+def ensure_search_indexes(sender, using, plan=None, **kwargs):
+    # Later migrations may rebuild the indexed tables on SQLite, dropping the triggers.
+    if sender.name != 'api' or not plan:
+        return
+    if ('api', '0022_search_indexes') in MigrationRecorder(connections[using]).applied_migrations():
+        install_search(connections[using])
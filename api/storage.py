@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+
+
+DIGEST_RE = re.compile(r'[0-9a-f]{64}')
+# Bytes needed to recognise every format in IMAGE_SIGNATURES
+SNIFF_SIZE = 12
+
+
+class PhotoTooLarge(Exception):
+    pass
+
+
+class NotAnImage(Exception):
+    pass
+
+
+def is_digest(value):
+    return isinstance(value, str) and DIGEST_RE.fullmatch(value) is not None
+
+
+class PhotoStore:
+    """
+    Content-addressed blob store for user photos.\n
+    Blobs live at `<root>/<aa>/<bb>/<sha256>` so identical uploads share one file
+    and a digest is all a database row has to keep.
+    """
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, root=None, max_size=None):
+        self.root = Path(root or settings.PHOTO_STORAGE_ROOT)
+        self.max_size = max_size if max_size is not None else settings.PHOTO_MAX_SIZE
+
+    def path(self, digest):
+        # Digests become path segments; anything but lowercase hex never reaches the filesystem.
+        if not is_digest(digest):
+            raise ValueError(f"Invalid photo digest: {digest!r}")
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def exists(self, digest):
+        return is_digest(digest) and self.path(digest).is_file()
+
+    def open(self, digest):
+        return open(self.path(digest), 'rb')
+
+    def save_stream(self, stream):
+        """
+        Write a readable stream to the store chunk by chunk, hashing as it goes.\n
+        Returns the hex digest of the content. Raises `PhotoTooLarge` once more than
+        `max_size` bytes have been read, and `NotAnImage` unless the content starts with
+        the signature of a JPEG, PNG, GIF or WebP image.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        head = b''
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if self.max_size and size > self.max_size:
+                        raise PhotoTooLarge(f"Photo exceeds {self.max_size} bytes")
+                    if len(head) < SNIFF_SIZE:
+                        head += chunk[:SNIFF_SIZE - len(head)]
+                    hasher.update(chunk)
+                    tmp.write(chunk)
+
+            if sniff_image_type(head) is None:
+                raise NotAnImage("Expected a JPEG, PNG, GIF or WebP image")
+            digest = hasher.hexdigest()
+            target = self.path(digest)
+
+            if target.exists():
+                os.unlink(tmp_path)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, target)
+            return digest
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def save_bytes(self, data):
+        return self.save_stream(BytesIO(data))
+
+    def size(self, digest):
+        return self.path(digest).stat().st_size
+
+    def content_type(self, digest):
+        with self.open(digest) as f:
+            head = f.read(SNIFF_SIZE)
+        return sniff_image_type(head) or 'application/octet-stream'
+
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def sniff_image_type(head):
+    """
+    The image content type `head` (the first `SNIFF_SIZE` bytes) starts with, or None.
+    """
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def get_photo_store():
+    return PhotoStore()
@@ -1,3 +1,1266 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import re
+import tempfile
+import time
+import zipfile
+from datetime import date, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from drf_spectacular.drainage import GENERATOR_STATS
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import events, models, serializers, services, throttling
+from .analytics import rebuild_summaries, summarize
+from .exports import iter_csv
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .results import XLSX_CONTENT_TYPE, import_results
+from .search import INDEXES, postgres_query, search
+from .authentication import user_cache
+from .openapi import schema_drift
+from .storage import get_photo_store
+from .transcripts import SEMESTER_ORDER, build_transcript
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 24
+
+
+class QueryPlanTests(TestCase):
+    """
+    Guard the hot lookups against falling back to full table scans.\n
+    Runs on SQLite by default and on Postgres when the suite is pointed at one; Postgres
+    is told to avoid sequential scans so an empty test table still proves the index is usable.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        faculty = models.Faculty.objects.create(name='Engineering', short_name='ENG')
+        department = models.Department.objects.create(name='Computer Science', short_name='CSE', faculty=faculty)
+        cls.course = models.Course.objects.create(
+            course_code='CSE-101',
+            course_title='Structured Programming',
+            dept_name=department,
+            course_credit=3,
+        )
+        cls.document = models.Document.objects.create(name='Transcript')
+        cls.student = models.CustomUser.objects.create_user(
+            'student@example.com',
+            'password',
+            student_id=200104,
+            session='2020-21',
+            department=department,
+        )
+
+    def explain(self, queryset):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
+
+    def assertUsesIndex(self, queryset, table, *indexes):
+        """
+        Assert the plan reads `table` through one of `indexes` (either is fine where the
+        planners can reasonably disagree) rather than some other index or a full scan.
+        """
+        plan = self.explain(queryset)
+
+        if connection.vendor == 'sqlite':
+            scans = [line for line in plan.splitlines() if f'SCAN {table}' in line and 'INDEX' not in line]
+            self.assertFalse(scans, f"Full scan of {table}:\n{plan}")
+        elif connection.vendor == 'postgresql':
+            self.assertNotIn(f'Seq Scan on {table}', plan, plan)
+        else:
+            self.skipTest(f"No plan check for {connection.vendor}")
+        self.assertTrue(any(index in plan for index in indexes), f"None of {', '.join(indexes)} used:\n{plan}")
+
+    def test_service_requests_by_student(self):
+        queryset = models.ServiceRequest.objects.filter(student=self.student).order_by('-created_at', '-id')
+        self.assertUsesIndex(queryset, 'api_servicerequest', 'service_student_created_idx')
+
+    def test_service_requests_by_student_and_status(self):
+        queryset = models.ServiceRequest.objects.filter(
+            student=self.student,
+            status=models.ServiceRequest.PENDING,
+        ).order_by('-created_at')
+        self.assertUsesIndex(queryset, 'api_servicerequest', 'service_student_status_idx')
+
+    def test_pending_queue_claim(self):
+        queryset = models.ServiceRequest.objects.filter(
+            Q(not_before__isnull=True) | Q(not_before__lte=timezone.now()),
+            status=models.ServiceRequest.PENDING,
+        ).order_by('created_at', 'id').values_list('pk', flat=True)[:1]
+        # SQLite can't match the partial index's condition against a bound parameter.
+        self.assertUsesIndex(queryset, 'api_servicerequest', 'service_pending_idx', 'service_status_created_idx')
+
+    def test_staff_listing_keyset_page(self):
+        created_at = timezone.now()
+        queryset = models.ServiceRequest.objects.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=100),
+            status=models.ServiceRequest.COMPLETED,
+        ).order_by('-created_at', '-id')[:51]
+        self.assertUsesIndex(queryset, 'api_servicerequest', 'service_status_created_idx')
+
+    def test_student_records_for_transcript(self):
+        queryset = models.StudentRecord.objects.filter(student=self.student).order_by('year', SEMESTER_ORDER)
+        self.assertUsesIndex(queryset, 'api_studentrecord', 'record_student_term_idx')
+
+    def test_latest_otp_by_email(self):
+        queryset = models.OTP.objects.filter(email='student@example.com').order_by('-created_at')[:1]
+        self.assertUsesIndex(queryset, 'api_otp', 'otp_email_created_idx')
+
+
+@override_settings(SERVER_WORKERS=1)
+class CatalogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        faculty = models.Faculty.objects.create(name='Engineering', short_name='ENG')
+        cls.department = models.Department.objects.create(name='Computer Science', short_name='CSE', faculty=faculty)
+
+    def setUp(self):
+        # A new version stamp, so nothing built by another test is served.
+        cache.clear()
+
+    def get(self, **headers):
+        return self.client.get('/api/v1/catalog/', **headers)
+
+    def test_etag_and_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['departments'][0]['short_name'], 'CSE')
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+
+        response = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_gzip(self):
+        plain = self.get()
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip;q=1, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertEqual(response['ETag'], plain['ETag'][:-1] + '-gzip"')
+
+    def test_saving_a_catalog_model_rebuilds(self):
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Course.objects.create(course_code='CSE-101', course_title='Structured Programming', dept_name=self.department, course_credit=3)
+
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([course['course_code'] for course in response.json()['courses']], ['CSE-101'])
+
+    @override_settings(SERVER_WORKERS=3, CATALOG_LOCAL_TTL=5)
+    def test_per_process_cache_catches_up_within_ttl(self):
+        now = time.monotonic()
+        with mock.patch('time.monotonic', return_value=now):
+            etag = self.get()['ETag']
+            # Saved by another worker: its bump lands in that worker's cache only.
+            models.Department.objects.filter(pk=self.department.pk).update(short_name='CS')
+            self.assertEqual(self.get()['ETag'], etag)
+        with mock.patch('time.monotonic', return_value=now + 5):
+            self.assertEqual(self.get().json()['departments'][0]['short_name'], 'CS')
+
+
+class PhotoTests(TestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings_override = override_settings(PHOTO_STORAGE_ROOT=root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = models.CustomUser.objects.create_user('photo@example.com', 'password', student_id=200105, is_active=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, data):
+        return self.client.put('/api/v1/users/me/photo/', data, content_type='image/png')
+
+    def test_upload_and_serve(self):
+        response = self.upload(PNG)
+        self.assertEqual(response.status_code, 200)
+
+        self.user.refresh_from_db()
+        response = self.client.get(f'/api/v1/photos/{self.user.photo_digest}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['X-Content-Type-Options'], 'nosniff')
+        self.assertEqual(b''.join(response.streaming_content), PNG)
+
+    def test_upload_rejects_non_images(self):
+        response = self.upload(b'<html><script>alert(1)</script></html>')
+        self.assertEqual(response.status_code, 415)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.photo_digest)
+
+    def test_digest_must_be_hex(self):
+        for digest in ['..', 'A' * 64, 'g' * 64, '0' * 63]:
+            self.assertFalse(get_photo_store().exists(digest))
+            self.assertEqual(self.client.get(f'/api/v1/photos/{digest}/').status_code, 404)
+        with self.assertRaises(ValueError):
+            get_photo_store().path('../' + '0' * 61)
+
+
+@override_settings(SERVER_WORKERS=1)
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = models.CustomUser.objects.create_user('cached@example.com', 'password', student_id=200106, is_active=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def get_me(self):
+        return self.client.get('/api/v1/users/me/?fields=email,full_name')
+
+    def test_user_is_served_from_cache(self):
+        self.assertEqual(self.get_me().status_code, 200)
+        hits = user_cache.hits
+        self.assertEqual(self.get_me().status_code, 200)
+        self.assertEqual(user_cache.hits, hits + 1)
+
+    def test_save_invalidates_cached_user(self):
+        self.assertIsNone(self.get_me().data['full_name'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.full_name = 'Renamed'
+            self.user.save(update_fields=['full_name'])
+        self.assertEqual(self.get_me().data['full_name'], 'Renamed')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save(update_fields=['is_active'])
+        self.assertEqual(self.get_me().status_code, 401)
+
+    @override_settings(SERVER_WORKERS=3)
+    def test_not_cached_when_other_workers_cant_see_the_stamp(self):
+        self.assertEqual(self.get_me().status_code, 200)
+        self.assertEqual(len(user_cache), 0)
+
+        # Another worker deactivates the user; its stamp never reaches this process.
+        models.CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get_me().status_code, 401)
+
+
+@override_settings(PASSWORD_HASH_WORKERS=1)
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.user = models.CustomUser.objects.create_user('hashing@example.com', 'password', student_id=200107, is_active=True)
+
+    def store(self, encoded):
+        models.CustomUser.objects.filter(pk=self.user.pk).update(password=encoded)
+        self.user.refresh_from_db()
+
+    def weak_argon2(self):
+        hasher = Argon2PasswordHasher()
+        hasher.time_cost = 1
+        hasher.memory_cost = hasher.memory_cost // 2
+        return hasher.encode('password', hasher.salt())
+
+    def assertUpgraded(self, old):
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, old)
+        self.assertTrue(self.user.password.startswith('argon2$'))
+        self.assertFalse(Argon2PasswordHasher().must_update(self.user.password))
+        self.assertTrue(self.user.check_password('password'))
+
+    def test_login_upgrades_hash_from_old_parameters(self):
+        old = self.weak_argon2()
+        self.store(old)
+
+        with mock.patch.object(throttling, '_store', None):
+            response = APIClient().post('/api/token/', {'email': 'hashing@example.com', 'password': 'password'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertUpgraded(old)
+
+    def test_login_upgrades_hash_from_other_algorithm(self):
+        old = PBKDF2PasswordHasher().encode('password', PBKDF2PasswordHasher().salt())
+        self.store(old)
+        self.assertTrue(self.user.check_password('password'))
+        self.assertUpgraded(old)
+
+    async def test_sync_and_async_checks_agree(self):
+        for encoded, outdated in ((self.weak_argon2(), True), (self.user.password, False)):
+            for password, valid in (('password', True), ('wrong', False)):
+                await models.CustomUser.objects.filter(pk=self.user.pk).aupdate(password=encoded)
+                sync_user = await models.CustomUser.objects.aget(pk=self.user.pk)
+                async_user = await models.CustomUser.objects.aget(pk=self.user.pk)
+
+                self.assertEqual(await sync_to_async(sync_user.check_password)(password), valid)
+                self.assertEqual(await async_user.acheck_password(password), valid)
+                # Both upgrade an outdated hash on success, and leave it alone otherwise.
+                self.assertEqual(sync_user.password != encoded, valid and outdated)
+                self.assertEqual(async_user.password != encoded, valid and outdated)
+                stored = (await models.CustomUser.objects.aget(pk=self.user.pk)).password
+                self.assertEqual(stored, async_user.password)
+
+
+class UserSerializerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = models.CustomUser.objects.create_user(
+            'fields@example.com', 'password', student_id=200111, session='2020-21', is_active=True,
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_sparse_fieldsets(self):
+        response = self.client.get('/api/v1/users/me/?fields=student_id,email')
+        self.assertEqual(response.json(), {'email': 'fields@example.com', 'student_id': 200111})
+
+        response = self.client.get('/api/v1/users/me/?fields=email,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_apply_lists_changed_columns_only(self):
+        changed = serializers.CustomUserSerializer.apply(self.user, {'session': '2020-21', 'mobile_number': '01700000000'})
+        self.assertEqual(changed, ['mobile_number', 'updated_at'])
+        self.assertEqual(serializers.CustomUserSerializer.apply(self.user, {'session': '2020-21'}), [])
+
+    def test_update_writes_changed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put('/api/v1/users/me/?fields=mobile_number', {'mobile_number': '01700000000', 'session': '2020-21'}, format='json')
+        self.assertEqual(response.json(), {'mobile_number': '01700000000'})
+
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "api_customuser"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"mobile_number"', updates[0])
+        self.assertNotIn('"session"', updates[0])
+        self.assertNotIn('"email"', updates[0])
+
+    def test_unchanged_update_writes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put('/api/v1/users/me/', {'session': '2020-21'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
+
+class BulkRegistrationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        faculty = models.Faculty.objects.create(name='Engineering', short_name='ENG')
+        cls.department = models.Department.objects.create(name='Computer Science', short_name='CSE', faculty=faculty)
+        cls.role = models.Role.objects.create(name='Student')
+        cls.admin = models.CustomUser.objects.create_superuser('admin@example.com', 'password', student_id=1)
+        models.CustomUser.objects.create_user('taken@example.com', 'password', student_id=200107)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def row(self, email, student_id, **fields):
+        return {
+            'email': email, 'password': 'secret-password', 'student_id': student_id,
+            'department': self.department.pk, 'role': self.role.pk, 'session': '2020-21', **fields,
+        }
+
+    def test_valid_rows_are_created_and_invalid_rows_reported(self):
+        rows = [
+            self.row('one@example.com', 300001),
+            self.row('taken@example.com', 300002),
+            self.row('two@example.com', 300001),
+            self.row('three@example.com', 300003, department=0),
+            self.row('four@example.com', 300004),
+        ]
+        response = self.client.post('/api/register/bulk/', rows, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(
+            [(error['row'], sorted(error['errors'])) for error in response.data['errors']],
+            [(2, ['email']), (3, ['student_id']), (4, ['department'])],
+        )
+        user = models.CustomUser.objects.get(email='four@example.com')
+        self.assertTrue(user.check_password('secret-password'))
+
+    def test_csv_body(self):
+        body = (
+            'email,password,student_id,department,role,session,full_name\n'
+            f'csv@example.com,secret-password,300005,{self.department.pk},{self.role.pk},2020-21,\n'
+        )
+        response = self.client.post('/api/register/bulk/', body, content_type='text/csv')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'created': 1, 'errors': []})
+        self.assertEqual(models.CustomUser.objects.get(email='csv@example.com').session, '2020-21')
+
+    def test_csv_that_is_not_utf8(self):
+        body = (
+            'email,password,student_id,department,role,session,full_name\n'
+            f'one@example.com,secret-password,300007,{self.department.pk},{self.role.pk},2020-21,Anne\n'
+            f'two@example.com,secret-password,300008,{self.department.pk},{self.role.pk},2020-21,Caf\xe9\n'
+        ).encode('latin-1')
+        response = self.client.post('/api/register/bulk/', body, content_type='text/csv')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {'detail': 'Row 2: CSV must be UTF-8'})
+        self.assertFalse(models.CustomUser.objects.filter(email='one@example.com').exists())
+
+    def test_admins_only(self):
+        self.client.force_authenticate(models.CustomUser.objects.get(email='taken@example.com'))
+        response = self.client.post('/api/register/bulk/', [self.row('five@example.com', 300006)], format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(OTP_ISSUE_LIMIT=2, OTP_VERIFY_LIMIT=3)
+class OTPTests(TestCase):
+    email = 'otp@example.com'
+
+    def setUp(self):
+        cache.clear()
+        # A fresh bucket store per test.
+        patcher = mock.patch.object(throttling, '_store', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def issue(self):
+        return self.client.post('/api/otp/', {'email': self.email}, format='json')
+
+    def verify(self, code):
+        return self.client.post('/api/otp/verify/', {'email': self.email, 'otp': code}, format='json')
+
+    def sent_code(self):
+        return re.search(r'\b(\d{6})\b', mail.outbox[-1].body).group(1)
+
+    def test_code_verifies_once(self):
+        self.assertEqual(self.issue().status_code, 202)
+        self.assertEqual(mail.outbox[-1].to, [self.email])
+        code = self.sent_code()
+
+        self.assertEqual(self.verify(code).status_code, 200)
+        self.assertEqual(self.verify(code).status_code, 400)
+        self.assertFalse(models.OTP.objects.filter(email=self.email).exists())
+
+    def test_only_newest_unexpired_code_verifies(self):
+        models.OTP.objects.create(email=self.email, otp='111111')
+        models.OTP.objects.create(email=self.email, otp='222222')
+        models.OTP.objects.filter(otp='111111').update(created_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.verify('111111').status_code, 400)
+
+        models.OTP.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.verify('222222').status_code, 400)
+
+    def test_issue_is_rate_limited(self):
+        self.issue()
+        self.issue()
+        response = self.issue()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_verify_is_rate_limited(self):
+        self.issue()
+        code = self.sent_code()
+        wrong = f'{(int(code) + 1) % 10 ** 6:06d}'
+        for _ in range(3):
+            self.assertEqual(self.verify(wrong).status_code, 400)
+
+        # Even the right code is refused once the attempts are used up.
+        response = self.verify(code)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_concurrent_verifications_succeed_once(self):
+        self.issue()
+        code = self.sent_code()
+
+        def verified_elsewhere_first(a, b):
+            # Another request matched the same code and consumed it meanwhile.
+            models.OTP.objects.filter(email=self.email).delete()
+            return True
+
+        with mock.patch('hmac.compare_digest', side_effect=verified_elsewhere_first):
+            self.assertEqual(self.verify(code).status_code, 400)
+
+    @override_settings(THROTTLE_RATES={'otp-ip': '2/min'})
+    def test_client_ip_is_limited_across_addresses(self):
+        statuses = [
+            self.client.post('/api/otp/', {'email': f'otp{n}@example.com'}, format='json').status_code
+            for n in range(3)
+        ]
+        self.assertEqual(statuses, [202, 202, 429])
+        self.assertEqual(len(mail.outbox), 2)
+
+
+class DocumentsVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        faculty = models.Faculty.objects.create(name='Engineering', short_name='ENG')
+        department = models.Department.objects.create(name='Computer Science', short_name='CSE', faculty=faculty)
+        cls.course = models.Course.objects.create(course_code='CSE-101', course_title='Structured Programming', dept_name=department, course_credit=3)
+        cls.student = models.CustomUser.objects.create_user('docs@example.com', 'password', student_id=200109, session='2020-21')
+
+    def version(self):
+        return models.CustomUser.objects.values_list('documents_version', flat=True).get(pk=self.student.pk)
+
+    def test_new_student_starts_at_zero(self):
+        self.assertEqual(self.version(), 0)
+
+    def test_only_document_fields_bump(self):
+        student = models.CustomUser.objects.get(pk=self.student.pk)
+        student.mobile_number = '01700000000'
+        student.last_login = timezone.now()
+        student.save()
+        self.assertEqual(self.version(), 0)
+
+        student.session = '2021-22'
+        student.save()
+        self.assertEqual(self.version(), 1)
+
+        # Unchanged since that save, so saving again bumps nothing.
+        student.save(update_fields=['session'])
+        self.assertEqual(self.version(), 1)
+
+    def test_full_save_keeps_concurrent_bump(self):
+        student = models.CustomUser.objects.get(pk=self.student.pk)
+        models.StudentRecord.objects.create(student=self.student, course=self.course, year=1, semester='1', gpa=3.5)
+        self.assertEqual(self.version(), 1)
+
+        student.mobile_number = '01700000000'
+        student.save()
+        self.assertEqual(self.version(), 1)
+
+
+class DocumentCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = models.CustomUser.objects.create_user('cached@example.com', 'password', student_id=200111, session='2020-21')
+        cls.document = models.Document.objects.create(name='Certificate')
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        overrides = override_settings(DOCUMENT_CACHE_ROOT=f'{root.name}/cache', DOCUMENT_STORAGE_ROOT=f'{root.name}/documents')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def request_on(self, day):
+        with mock.patch.object(timezone, 'localdate', return_value=day):
+            service_request = services.enqueue(self.student, self.document)
+            if service_request.status == models.ServiceRequest.PENDING:
+                services.process(services.claim_next())
+        service_request.refresh_from_db()
+        return service_request, services.document_path(service_request).read_text()
+
+    def test_cached_copy_is_reused_on_the_same_day_only(self):
+        first, page = self.request_on(date(2026, 3, 1))
+        self.assertIn('Issued on 2026-03-01', page)
+
+        again, page = self.request_on(date(2026, 3, 1))
+        self.assertEqual((first.attempts, again.attempts), (1, 0))
+        self.assertIn('Issued on 2026-03-01', page)
+
+        later, page = self.request_on(date(2026, 3, 20))
+        self.assertEqual(later.attempts, 1, "rendered by a worker rather than served from the cache")
+        self.assertIn('Issued on 2026-03-20', page)
+
+    def test_evicted_between_lookup_and_link_is_a_miss(self):
+        self.request_on(date(2026, 3, 1))
+        with (
+            mock.patch.object(timezone, 'localdate', return_value=date(2026, 3, 1)),
+            mock.patch.object(services, 'link_or_copy', side_effect=FileNotFoundError),
+        ):
+            service_request = services.enqueue(self.student, self.document)
+        self.assertEqual(service_request.status, models.ServiceRequest.PENDING)
+        self.assertEqual(models.ServiceRequest.objects.count(), 2)
+
+
+class TranscriptTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        faculty = models.Faculty.objects.create(name='Engineering', short_name='ENG')
+        department = models.Department.objects.create(name='Computer Science', short_name='CSE', faculty=faculty)
+        cls.courses = [
+            models.Course.objects.create(course_code=f'CSE-{n}01', course_title=f'Course {n}', dept_name=department, course_credit=credit)
+            for n, credit in enumerate((3, 2, 4), start=1)
+        ]
+        cls.student = models.CustomUser.objects.create_user('transcript@example.com', 'password', student_id=200150, session='2020-21')
+
+    def record(self, course, year, semester, gpa):
+        models.StudentRecord.objects.create(student=self.student, course=course, year=year, semester=semester, gpa=gpa)
+
+    def test_semesters_in_numeric_order(self):
+        first, second, third = self.courses
+        self.record(first, 2024, '10', 3.0)
+        self.record(second, 2024, '2', 4.0)
+        self.record(third, 2023, '11', 2.0)
+        self.record(first, 2024, '1', 3.5)
+
+        transcript = build_transcript(self.student)
+
+        self.assertEqual(
+            [(semester['year'], semester['semester']) for semester in transcript['semesters']],
+            [(2023, '11'), (2024, '1'), (2024, '2'), (2024, '10')],
+        )
+
+    def test_gpa_cgpa_and_earned_credits(self):
+        first, second, third = self.courses
+        self.record(first, 2024, '1', 3.5)
+        self.record(second, 2024, '1', 0.0)
+        self.record(third, 2024, '2', 3.0)
+
+        transcript = build_transcript(self.student)
+        first_term, second_term = transcript['semesters']
+
+        # A failed course counts towards the GPA but not towards credits earned.
+        self.assertEqual(first_term['credits'], 5)
+        self.assertEqual(first_term['gpa'], 2.1)
+        self.assertEqual(second_term['gpa'], 3.0)
+        self.assertEqual(transcript['cgpa'], round((3 * 3.5 + 2 * 0.0 + 4 * 3.0) / 9, 2))
+        self.assertEqual(transcript['total_credits'], 7)
+
+    def test_empty_record(self):
+        self.assertEqual(build_transcript(self.student), {'semesters': [], 'cgpa': 0.0, 'total_credits': 0.0})
+
+        client = APIClient()
+        client.force_authenticate(self.student)
+        response = client.get('/api/v1/users/me/transcript/', {'render': 'html'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('CGPA: 0.0', b''.join(response.streaming_content).decode())
+
+
+@override_settings(RESULTS_IMPORT_CHUNK_SIZE=1)
+class ResultImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        faculty = models.Faculty.objects.create(name='Engineering', short_name='ENG')
+        department = models.Department.objects.create(name='Computer Science', short_name='CSE', faculty=faculty)
+        models.Course.objects.create(course_code='CSE-101', course_title='Structured Programming', dept_name=department, course_credit=3)
+        cls.admin = models.CustomUser.objects.create_superuser('staff@example.com', 'password', student_id=1, session='staff')
+        models.CustomUser.objects.create_user('result@example.com', 'password', student_id=200130, session='2020-21')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def upload(self, body, content_type):
+        return self.client.post('/api/v1/staff/records/import/', body, content_type=content_type)
+
+    def xlsx(self, *rows):
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        for row in rows:
+            sheet.append(row)
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        return buffer.getvalue()
+
+    def test_xlsx(self):
+        body = self.xlsx(('student_id', 'course_code', 'year', 'semester', 'gpa'), (200130, 'CSE-101', 2024, '1', 3.5))
+        response = self.upload(body, XLSX_CONTENT_TYPE)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'rows': 1, 'written': 1, 'error_count': 0, 'errors': []})
+
+    def test_csv_that_is_not_utf8_stops_with_what_was_written(self):
+        body = (
+            'student_id,course_code,year,semester,gpa\n'
+            '200130,CSE-101,2024,1,3.5\n'
+            '200130,Caf\xe9,2024,2,3.0\n'
+        ).encode('latin-1')
+        response = self.upload(body, 'text/csv')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], 'Row 2: CSV must be UTF-8')
+        self.assertEqual((response.data['rows'], response.data['written']), (1, 1))
+        self.assertEqual(models.StudentRecord.objects.count(), 1)
+
+    def test_not_a_workbook(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('notes.txt', 'not a workbook')
+
+        for body in (archive.getvalue(), b'not even a zip'):
+            response = self.upload(body, XLSX_CONTENT_TYPE)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data['detail'], 'Not a readable XLSX workbook')
+            self.assertEqual(response.data['written'], 0)
+
+
+class ResultSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        faculty = models.Faculty.objects.create(name='Engineering', short_name='ENG')
+        department = models.Department.objects.create(name='Computer Science', short_name='CSE', faculty=faculty)
+        cls.course = models.Course.objects.create(course_code='CSE-101', course_title='Structured Programming', dept_name=department, course_credit=3)
+        cls.first = models.CustomUser.objects.create_user('first@example.com', 'password', student_id=200112, session='2020-21')
+        cls.second = models.CustomUser.objects.create_user('second@example.com', 'password', student_id=200113, session='2020-21')
+
+    def totals(self):
+        return {
+            (row.course_id, row.session): (row.results, row.passed, row.gpa_total)
+            for row in models.ResultSummary.objects.filter(results__gt=0)
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.totals()
+        rebuild_summaries()
+        self.assertEqual(incremental, self.totals())
+
+    def import_sheet(self, *gpas):
+        rows = [
+            {'student_id': student_id, 'course_code': 'CSE-101', 'year': 2024, 'semester': '1', 'gpa': gpa}
+            for student_id, gpa in zip((200112, 200113), gpas)
+        ]
+        return import_results(rows)
+
+    def test_import_counts_each_result_once(self):
+        self.assertEqual(self.import_sheet(3.5, 0)['written'], 2)
+        self.assertEqual(self.totals(), {(self.course.pk, '2020-21'): (2, 1, 3.5)})
+
+        # Importing a corrected sheet replaces the GPAs rather than adding results.
+        self.import_sheet(3.0, 2.0)
+        self.assertEqual(self.totals(), {(self.course.pk, '2020-21'): (2, 2, 5.0)})
+        self.assertMatchesRebuild()
+
+        self.assertEqual(summarize('courses')[0]['pass_rate'], 1.0)
+
+    def test_saves_and_deletes(self):
+        record = models.StudentRecord.objects.create(student=self.first, course=self.course, year=2024, semester='1', gpa=2.0)
+        self.assertEqual(self.totals(), {(self.course.pk, '2020-21'): (1, 1, 2.0)})
+
+        record = models.StudentRecord.objects.get(pk=record.pk)
+        record.gpa = 0
+        with CaptureQueriesContext(connection) as queries:
+            record.save()
+        # The old GPA comes from the loaded row, not a second read of it.
+        self.assertFalse([q for q in queries if q['sql'].startswith('SELECT') and 'FROM "api_studentrecord"' in q['sql']])
+        self.assertEqual(self.totals(), {(self.course.pk, '2020-21'): (1, 0, 0.0)})
+
+        record.student = self.second
+        self.second.session = '2021-22'
+        self.second.save()
+        record.save()
+        self.assertEqual(self.totals(), {(self.course.pk, '2021-22'): (1, 0, 0.0)})
+        self.assertMatchesRebuild()
+
+        record.delete()
+        self.assertEqual(self.totals(), {})
+
+    def test_session_change_moves_results(self):
+        self.import_sheet(3.5, 2.5)
+        student = models.CustomUser.objects.get(pk=self.first.pk)
+        student.session = '2021-22'
+        student.save()
+
+        self.assertEqual(self.totals(), {
+            (self.course.pk, '2020-21'): (1, 1, 2.5),
+            (self.course.pk, '2021-22'): (1, 1, 3.5),
+        })
+        self.assertMatchesRebuild()
+
+
+@override_settings(SERVICE_MAX_ATTEMPTS=2, SERVICE_RETRY_BACKOFF=30, SERVICE_CLAIM_TIMEOUT=600)
+class ServiceQueueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = models.CustomUser.objects.create_user('queue@example.com', 'password', student_id=200108)
+        cls.document = models.Document.objects.create(name='Unrendered')
+
+    def enqueue(self, **fields):
+        return models.ServiceRequest.objects.create(student=self.student, request_doc=self.document, **fields)
+
+    def test_claims_oldest_pending_request_once(self):
+        first, second = self.enqueue(), self.enqueue()
+
+        claimed = services.claim_next()
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual((claimed.status, claimed.attempts), (models.ServiceRequest.PROCESSING, 1))
+        self.assertIsNotNone(claimed.claimed_at)
+
+        self.assertEqual(services.claim_next().pk, second.pk)
+        self.assertIsNone(services.claim_next())
+
+    def test_claim_loses_to_a_concurrent_claim(self):
+        service_request = self.enqueue()
+        # Another worker claims the row between this one reading and updating it.
+        won = models.ServiceRequest.objects.filter(pk=service_request.pk, status=models.ServiceRequest.PENDING)
+        self.assertEqual(services.mark_claimed(won), 1)
+        self.assertEqual(services.mark_claimed(won), 0)
+        service_request.refresh_from_db()
+        self.assertEqual(service_request.attempts, 1)
+
+    def test_backing_off_requests_wait_their_turn(self):
+        self.enqueue(not_before=timezone.now() + timedelta(minutes=1))
+        self.assertIsNone(services.claim_next())
+
+        ready = self.enqueue(not_before=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(services.claim_next().pk, ready.pk)
+
+    def test_failed_attempt_is_retried_after_backoff_then_failed(self):
+        self.enqueue()
+        renderer = mock.Mock(side_effect=OSError('disk full'))
+
+        with mock.patch.object(services, 'get_renderer', return_value=renderer), self.assertLogs('api.services', 'ERROR'):
+            services.process(services.claim_next())
+            service_request = models.ServiceRequest.objects.get()
+            self.assertEqual(service_request.status, models.ServiceRequest.PENDING)
+            self.assertGreater(service_request.not_before, timezone.now() + timedelta(seconds=20))
+            self.assertIsNone(services.claim_next())
+
+            models.ServiceRequest.objects.update(not_before=None)
+            services.process(services.claim_next())
+
+        service_request.refresh_from_db()
+        self.assertEqual((service_request.status, service_request.attempts), (models.ServiceRequest.FAILED, 2))
+        self.assertEqual(service_request.error, 'disk full')
+
+    def test_stale_claims_are_requeued_until_attempts_run_out(self):
+        claimed_at = timezone.now() - timedelta(hours=1)
+        retried = self.enqueue(status=models.ServiceRequest.PROCESSING, claimed_at=claimed_at, attempts=1)
+        exhausted = self.enqueue(status=models.ServiceRequest.PROCESSING, claimed_at=claimed_at, attempts=2)
+        running = self.enqueue(status=models.ServiceRequest.PROCESSING, claimed_at=timezone.now(), attempts=1)
+
+        self.assertEqual(services.requeue_stale(), 2)
+
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual(retried.status, models.ServiceRequest.PENDING)
+        self.assertIsNotNone(retried.not_before)
+        self.assertEqual(exhausted.status, models.ServiceRequest.FAILED)
+        self.assertEqual(running.status, models.ServiceRequest.PROCESSING)
+
+    def test_late_worker_does_not_complete_a_reclaimed_request(self):
+        self.enqueue()
+        stale = services.claim_next()
+        # Its claim times out, the request is requeued and another worker claims it.
+        models.ServiceRequest.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        services.requeue_stale()
+        models.ServiceRequest.objects.update(not_before=None)
+        current = services.claim_next()
+
+        renderer = mock.Mock(return_value=['<p>Done</p>'])
+        with (
+            tempfile.TemporaryDirectory() as root,
+            override_settings(DOCUMENT_CACHE_ROOT=f'{root}/cache', DOCUMENT_STORAGE_ROOT=f'{root}/documents'),
+            mock.patch.object(services, 'get_renderer', return_value=renderer),
+            self.assertLogs('api.services', 'WARNING'),
+        ):
+            services.process(stale)
+        service_request = models.ServiceRequest.objects.get()
+        self.assertEqual((service_request.status, service_request.attempts), (models.ServiceRequest.PROCESSING, 2))
+        self.assertEqual(service_request.claimed_at, current.claimed_at)
+
+    def test_get_with_doc_type_is_refused(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        self.assertEqual(client.get('/api/v1/services/').status_code, 200)
+        response = client.get('/api/v1/services/', {'doc_type': 'transcript'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(models.ServiceRequest.objects.exists())
+
+
+@override_settings(SERVICE_EVENTS_WSGI_WAIT_MAX=0)
+class ServiceEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = models.CustomUser.objects.create_user('events@example.com', 'password', student_id=200110, is_active=True)
+        document = models.Document.objects.create(name='Transcript')
+        cls.service_request = models.ServiceRequest.objects.create(
+            student=cls.student, request_doc=document, status=models.ServiceRequest.COMPLETED,
+        )
+        cls.authorization = f'Bearer {AccessToken.for_user(cls.student)}'
+
+    def test_event_stream_needs_asgi(self):
+        response = self.client.get(f'/api/v1/services/{self.service_request.pk}/events/', HTTP_AUTHORIZATION=self.authorization)
+        self.assertEqual(response.status_code, 501)
+
+    async def test_event_stream_under_asgi(self):
+        response = await AsyncClient().get(
+            f'/api/v1/services/{self.service_request.pk}/events/',
+            headers={'Authorization': self.authorization, 'Accept': 'text/event-stream'},
+        )
+        self.assertEqual(response.status_code, 200)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertTrue(body.startswith('event: status\n'))
+        self.assertIn('"Completed"', body)
+
+    def test_long_poll_is_capped_under_wsgi(self):
+        response = self.client.get(
+            f'/api/v1/services/{self.service_request.pk}/wait/?timeout=30',
+            HTTP_AUTHORIZATION=self.authorization,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], models.ServiceRequest.COMPLETED)
+
+
+class StaffListingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = models.CustomUser.objects.create_superuser('listing-staff@example.com', 'password', student_id=2, session='staff')
+        student = models.CustomUser.objects.create_user('listing@example.com', 'password', student_id=200140, session='2020-21')
+        document = models.Document.objects.create(name='Transcript')
+        start = timezone.now()
+        # Three requests share a created_at, so only the id tells them apart.
+        stamps = [start, start, start, start + timedelta(seconds=1), start + timedelta(seconds=2)]
+        cls.requests = [models.ServiceRequest.objects.create(student=student, request_doc=document) for _ in stamps]
+        for service_request, created_at in zip(cls.requests, stamps):
+            models.ServiceRequest.objects.filter(pk=service_request.pk).update(created_at=created_at)
+        # Newest first, and the higher id first within the tie.
+        cls.newest_first = [service_request.pk for service_request in reversed(cls.requests)]
+
+    def test_cursor_round_trip(self):
+        created_at = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(created_at, 42)), (created_at, 42))
+
+    def test_pages_break_ties_by_id(self):
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = keyset_page(models.ServiceRequest.objects.all(), cursor, 2)
+            seen.append([row.pk for row in rows])
+            if cursor is None:
+                break
+        self.assertEqual([len(page) for page in seen], [2, 2, 1])
+        self.assertEqual(sum(seen, []), self.newest_first)
+
+    def test_staff_listing_follows_next(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+
+        seen = []
+        url = '/api/v1/staff/services/?limit=2'
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, self.newest_first)
+
+    def test_malformed_cursor(self):
+        for cursor in ('!!!', 'bm90LWEtY3Vyc29y', '__8', encode_cursor(timezone.now(), 1)[:-4]):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/v1/staff/services/', {'cursor': 'bm90LWEtY3Vyc29y'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['detail'], 'Invalid filter or cursor')
+
+
+class MetricsTests(TestCase):
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_hidden_without_token(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 404)
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_open_in_development(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='scrape-me', DEBUG=False)
+    def test_token_required(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-me')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'api_auth_user_cache_hits_total', response.content)
+
+
+@override_settings(THROTTLE_RATES={'login-ip': '100/min', 'login-email': '2/min', 'refresh-ip': '2/min'})
+class ThrottleTests(TestCase):
+    def setUp(self):
+        # A fresh bucket store per test.
+        patcher = mock.patch.object(throttling, '_store', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def login(self, email):
+        return self.client.post('/api/token/', {'email': email, 'password': 'wrong'}, format='json')
+
+    def test_bucket_runs_out_with_retry_after(self):
+        self.assertEqual(self.login('a@example.com').status_code, 401)
+        self.assertEqual(self.login('A@example.com ').status_code, 401)
+
+        response = self.login('a@example.com')
+        self.assertEqual(response.status_code, 429)
+        # Two tokens a minute: the next one is 30 seconds away.
+        self.assertIn(int(response['Retry-After']), range(29, 31))
+
+        # Other emails have buckets of their own.
+        self.assertEqual(self.login('b@example.com').status_code, 401)
+
+    def test_bucket_refills(self):
+        self.login('a@example.com')
+        self.login('a@example.com')
+        with mock.patch('time.time', return_value=time.time() + 30):
+            self.assertEqual(self.login('a@example.com').status_code, 401)
+            self.assertEqual(self.login('a@example.com').status_code, 429)
+
+    @override_settings(THROTTLE_RATES={'login-ip': '2/min'})
+    def test_ip_limit_ignores_forwarded_for(self):
+        # A client making up a new forwarded address per request still shares one bucket.
+        statuses = []
+        for n in range(3):
+            response = self.client.post(
+                '/api/token/', {'email': f'{n}@example.com', 'password': 'wrong'}, format='json',
+                HTTP_X_FORWARDED_FOR=f'203.0.113.{n}',
+            )
+            statuses.append(response.status_code)
+        self.assertEqual(statuses, [401, 401, 429])
+
+    def test_base_class_needs_cache_key(self):
+        with self.assertRaisesMessage(NotImplementedError, '.get_cache_key() must be overridden'):
+            throttling.TokenBucketThrottle().get_cache_key(None, None)
+
+    @override_settings(THROTTLE_MAX_CONCURRENT=1)
+    def test_sheds_load_past_concurrency_limit(self):
+        with mock.patch.object(throttling, '_slots', None):
+            slots = throttling.get_slots()
+            slots.acquire()
+            try:
+                response = self.login('c@example.com')
+            finally:
+                slots.release()
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
+            self.assertEqual(self.login('c@example.com').status_code, 401)
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        faculty = models.Faculty.objects.create(name='Engineering', short_name='ENG')
+        cls.department = models.Department.objects.create(name='Computer Science', short_name='CSE', faculty=faculty)
+        course = models.Course.objects.create(course_code='CSE-101', course_title='Structured Programming', dept_name=cls.department, course_credit=3)
+        cls.admin = models.CustomUser.objects.create_superuser('staff@example.com', 'password', student_id=1, session='staff')
+        for n in range(5):
+            student = models.CustomUser.objects.create_user(
+                f'student{n}@example.com', 'password', student_id=300100 + n, session='2020-21' if n % 2 else '2021-22',
+                department=cls.department, full_name=f'Student, "{n}"', photo_digest='a' * 64 if n == 1 else None,
+            )
+            models.StudentRecord.objects.create(student=student, course=course, year=2024, semester='1', gpa=3.0 + n / 10)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, kind, **params):
+        response = self.client.get(f'/api/v1/staff/exports/{kind}/', params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_students_csv(self):
+        response, body = self.export('students', session='2020-21', department=self.department.pk)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="students-[\d-]+\.csv"$')
+
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row['student_id'] for row in rows], ['300101', '300103'])
+        self.assertEqual(rows[0]['full_name'], 'Student, "1"')
+        self.assertEqual(rows[0]['department'], 'CSE')
+        self.assertNotIn('user_photo', rows[0])
+
+    def test_students_with_photos(self):
+        _, body = self.export('students', session='2020-21', include_photo='true')
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(rows[0]['user_photo'], f'/api/v1/photos/{"a" * 64}/')
+        self.assertEqual(rows[1]['user_photo'], '')
+
+    def test_records_jsonl(self):
+        response, body = self.export('records', output='jsonl')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[2]['student_id'], 300102)
+        self.assertEqual(rows[2]['course_code'], 'CSE-101')
+        self.assertEqual(rows[2]['gpa'], 3.2)
+
+    def test_csv_is_encoded_in_batches(self):
+        chunks = list(iter_csv(('n',), iter([(n,) for n in range(5)]), batch_size=2))
+        self.assertEqual(chunks, ['n\r\n0\r\n1\r\n', '2\r\n3\r\n', '4\r\n'])
+
+    def test_rejects_bad_parameters_and_non_staff(self):
+        self.assertEqual(self.client.get('/api/v1/staff/exports/students/', {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/staff/exports/students/', {'department': 'x'}).status_code, 400)
+
+        self.client.force_authenticate(models.CustomUser.objects.get(student_id=300100))
+        self.assertEqual(self.client.get('/api/v1/staff/exports/students/').status_code, 403)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        faculty = models.Faculty.objects.create(name='Engineering', short_name='ENG')
+        department = models.Department.objects.create(name='Computer Science', short_name='CSE', faculty=faculty)
+        models.Course.objects.create(course_code='CSE-101', course_title='Structured Programming', dept_name=department, course_credit=3)
+        models.Course.objects.create(course_code='CSE-201', course_title='Data Structures', dept_name=department, course_credit=3)
+        cls.admin = models.CustomUser.objects.create_superuser('staff@example.com', 'password', student_id=1, session='staff')
+        cls.uddin = models.CustomUser.objects.create_user(
+            'uddin@example.com', 'password', student_id=200101, session='2020-21', full_name='Karim Uddin',
+        )
+        cls.karim = models.CustomUser.objects.create_user(
+            'karim@example.com', 'password', student_id=200102, session='2020-21', full_name='Abdul Karim',
+        )
+        models.CustomUser.objects.create_user(
+            'rahim@example.com', 'password', student_id=210103, session='2021-22', full_name='Rahim Khan',
+        )
+
+    def ids(self, name, text, limit=20):
+        return [row['id'] for row in search(name, text, limit)]
+
+    def test_every_word_matches_a_prefix(self):
+        self.assertEqual(set(self.ids('students', 'kar 2020')), {self.uddin.pk, self.karim.pk})
+        self.assertEqual(self.ids('students', 'rah kha'), [models.CustomUser.objects.get(student_id=210103).pk])
+        self.assertEqual(self.ids('students', 'karim 2021'), [])
+        self.assertEqual(self.ids('students', '  ,.  '), [])
+
+    def test_best_match_survives_the_limit(self):
+        # Earlier ids must not crowd out better matches before they are ranked.
+        self.assertEqual(self.ids('students', 'karim'), [self.karim.pk, self.uddin.pk])
+        self.assertEqual(self.ids('students', 'karim', limit=1), [self.karim.pk])
+
+    def test_follows_updates(self):
+        models.CustomUser.objects.filter(pk=self.uddin.pk).update(full_name='Jamal Uddin')
+        self.assertEqual(self.ids('students', 'karim'), [self.karim.pk])
+        self.assertEqual(self.ids('students', 'jam'), [self.uddin.pk])
+
+    def test_courses(self):
+        rows = search('courses', 'struct')
+        self.assertEqual([row['course_code'] for row in rows], ['CSE-101', 'CSE-201'])
+        self.assertEqual(set(rows[0]), {'id', 'course_code', 'course_title', 'department'})
+
+    def test_staff_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/v1/staff/search/students/', {'q': 'karim', 'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['student_id'] for row in response.data['results']], [200102])
+        self.assertEqual(client.get('/api/v1/staff/search/students/', {'q': 'karim', 'limit': 'x'}).status_code, 400)
+
+        client.force_authenticate(self.karim)
+        self.assertEqual(client.get('/api/v1/staff/search/students/', {'q': 'karim'}).status_code, 403)
+
+    def test_postgres_query_ranks_before_limiting(self):
+        sql, params = postgres_query(INDEXES['students'], ['50', 'a'], '50%_a', 10)
+        self.assertRegex(sql, r'ORDER BY ts_rank\(.+\) DESC, .+ LIMIT %s$')
+        self.assertEqual(sql.count('%s'), len(params))
+        self.assertEqual(params, ['50:* & a:*', r'%50\%\_a%', '50:* & a:*', 10])
+
+        sql, params = postgres_query(INDEXES['students'], ['ab'], 'ab', 10)
+        self.assertNotIn('ILIKE', sql)
+        self.assertEqual(params, ['ab:*', 'ab:*', 10])
+
+    @skipUnless(connection.vendor == 'postgresql', "Postgres full-text search")
+    def test_postgres_search_uses_its_indexes(self):
+        self.assertEqual(self.ids('students', 'karim', limit=1), [self.karim.pk])
+        # Substring matches through the trigram index.
+        self.assertEqual(self.ids('students', 'im@exam'), [self.karim.pk])
+
+        for text, index in (('kar', 'api_customuser_search_tsv_idx'), ('im@exam', 'api_customuser_search_trgm_idx')):
+            sql, params = postgres_query(INDEXES['students'], re.findall(r'\w+', text), text, 20)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}', params)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            self.assertIn(index, plan)
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class AdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = models.CustomUser.objects.create_superuser('staff@example.com', 'password', student_id=1, session='staff')
+        cls.student = models.CustomUser.objects.create_user('admin-student@example.com', 'password', student_id=200120, session='2020-21')
+        cls.document = models.Document.objects.create(name='Transcript')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_add_user_with_password(self):
+        response = self.client.get('/admin/api/customuser/add/')
+        self.assertContains(response, 'name="password1"')
+        self.assertContains(response, 'name="usable_password"')
+
+        response = self.client.post('/admin/api/customuser/add/', {
+            'email': 'new@example.com',
+            'student_id': 200121,
+            'session': '2021-22',
+            'usable_password': 'true',
+            'password1': 'a-long-passphrase',
+            'password2': 'a-long-passphrase',
+        })
+        self.assertEqual(response.status_code, 302)
+        user = models.CustomUser.objects.get(email='new@example.com')
+        self.assertTrue(user.check_password('a-long-passphrase'))
+
+    def test_change_password(self):
+        response = self.client.get(f'/admin/api/customuser/{self.student.pk}/change/')
+        self.assertContains(response, '../password/')
+        self.assertNotContains(response, 'name="password"')
+
+        response = self.client.post(f'/admin/api/customuser/{self.student.pk}/password/', {
+            'usable_password': 'true',
+            'password1': 'a-long-passphrase',
+            'password2': 'a-long-passphrase',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.check_password('a-long-passphrase'))
+
+    def test_requeue_resets_attempts_and_notifies_once(self):
+        requests = [
+            models.ServiceRequest.objects.create(
+                student=self.student, request_doc=self.document, status=models.ServiceRequest.FAILED,
+                attempts=3, error='disk full', not_before=timezone.now() + timedelta(minutes=1),
+            )
+            for _ in range(3)
+        ]
+        pks = [service_request.pk for service_request in requests]
+
+        with mock.patch.object(events.status_hub, 'publish') as publish, self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.post('/admin/api/servicerequest/', {'action': 'requeue', '_selected_action': pks})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(sorted(call.args for call in publish.call_args_list), [(pk, models.ServiceRequest.PENDING) for pk in pks])
+
+        for service_request in models.ServiceRequest.objects.filter(pk__in=pks):
+            self.assertEqual(service_request.status, models.ServiceRequest.PENDING)
+            self.assertEqual(service_request.attempts, 0)
+            self.assertIsNone(service_request.not_before)
+            self.assertIsNone(service_request.error)
+
+
+    def test_status_change_on_change_form_notifies(self):
+        service_request = models.ServiceRequest.objects.create(student=self.student, request_doc=self.document)
+        url = f'/admin/api/servicerequest/{service_request.pk}/change/'
+        form = {'student': self.student.pk, 'request_doc': self.document.pk, 'not_before_0': '', 'not_before_1': ''}
+
+        with mock.patch.object(events.status_hub, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {**form, 'status': models.ServiceRequest.PENDING})
+        self.assertEqual(response.status_code, 302)
+        publish.assert_not_called()
+
+        with mock.patch.object(events.status_hub, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {**form, 'status': models.ServiceRequest.FAILED})
+        self.assertEqual(response.status_code, 302)
+        publish.assert_called_once_with(service_request.pk, models.ServiceRequest.FAILED)
+        service_request.refresh_from_db()
+        self.assertEqual(service_request.status, models.ServiceRequest.FAILED)
+
+class SchemaTests(SimpleTestCase):
+    def test_committed_schema_is_current(self):
+        with GENERATOR_STATS.silence():
+            drift = schema_drift()
+        self.assertFalse(drift, f"openapi.json is out of date, run `python manage.py build_schema`:\n{drift}")
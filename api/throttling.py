@@ -0,0 +1,184 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from .cache import LocalTTLCache
+from .metrics import registry
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    `'10/min'` -> `(10, 60)`: a bucket of 10 tokens that refills completely in a minute.
+    """
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class BucketStore:
+    """
+    Token buckets keyed by string, each stored as `(tokens, updated_at)`.\n
+    Subclasses provide `load` and `save`; `take` refills the bucket for the time elapsed
+    since it was last touched and spends one token.
+    """
+
+    def take(self, key, capacity, period):
+        """
+        Spend a token from the bucket. Returns 0 when one was available, otherwise the
+        seconds until the next one is.
+        """
+        rate = capacity / period
+        now = time.time()
+        tokens, updated_at = self.load(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0
+        else:
+            wait = (1 - tokens) / rate
+
+        # Once full again the bucket is indistinguishable from a missing one.
+        self.save(key, (tokens, now), math.ceil((capacity - tokens) / rate))
+        return wait
+
+    def load(self, key):
+        raise NotImplementedError('.load() must be overridden')
+
+    def save(self, key, bucket, timeout):
+        raise NotImplementedError('.save() must be overridden')
+
+
+class LocalBucketStore(BucketStore):
+    """
+    Buckets in this process's memory. Exact, but each server process limits on its own.
+    """
+
+    def __init__(self):
+        self._buckets = LocalTTLCache(max_size=settings.THROTTLE_LOCAL_MAX_KEYS, ttl=PERIODS['d'])
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, period):
+        with self._lock:
+            return super().take(key, capacity, period)
+
+    def load(self, key):
+        return self._buckets.get(key)
+
+    def save(self, key, bucket, timeout):
+        self._buckets.set(key, bucket)
+
+
+class CacheBucketStore(BucketStore):
+    """
+    Buckets in the `THROTTLE_CACHE_ALIAS` cache, shared by every process using it (e.g.
+    Redis). Concurrent requests for the same key can race between read and write, so
+    limits are approximate by at most a few requests.
+    """
+
+    def load(self, key):
+        return caches[settings.THROTTLE_CACHE_ALIAS].get(key)
+
+    def save(self, key, bucket, timeout):
+        caches[settings.THROTTLE_CACHE_ALIAS].set(key, bucket, max(timeout, 1))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = import_string(settings.THROTTLE_STORE)()
+        return _store
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token-bucket limit for the view's `throttle_scope`, per `ident`.\n
+    The rate is looked up in `THROTTLE_RATES` as `<scope>-<ident_name>`; scopes without
+    a rate are not limited.
+    """
+    ident_name = None
+
+    def get_cache_key(self, request, view):
+        """
+        The `ident` to limit the request by, or None to let it through unlimited.
+        """
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = settings.THROTTLE_RATES.get(f'{scope}-{self.ident_name}')
+        ident = self.get_cache_key(request, view)
+        if rate is None or ident is None:
+            return True
+
+        capacity, period = parse_rate(rate)
+        self.wait_time = get_bucket_store().take(f'throttle:{scope}:{self.ident_name}:{ident}', capacity, period)
+        if self.wait_time:
+            registry.increment('api_throttled_total', scope=scope, reason=self.ident_name)
+            return False
+        return True
+
+    def wait(self):
+        # DRF truncates Retry-After to whole seconds; never tell a client to retry in 0.
+        return math.ceil(self.wait_time)
+
+
+class IPRateThrottle(TokenBucketThrottle):
+    ident_name = 'ip'
+
+    def get_cache_key(self, request, view):
+        return self.get_ident(request)
+
+
+class EmailRateThrottle(TokenBucketThrottle):
+    ident_name = 'email'
+
+    def get_cache_key(self, request, view):
+        data = request.data
+        email = data.get('email') if hasattr(data, 'get') else None
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def get_slots():
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(settings.THROTTLE_MAX_CONCURRENT)
+        return _slots
+
+
+class ShedLoadMixin:
+    """
+    Cap how many requests of the view's kind run at once in this process.\n
+    Once `THROTTLE_MAX_CONCURRENT` of them are in flight, further ones are refused with
+    **429** and `Retry-After` instead of queueing behind the password hashing pool.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not get_slots().acquire(blocking=False):
+            registry.increment('api_throttled_total', scope=self.throttle_scope, reason='concurrency')
+            raise Throttled(wait=settings.THROTTLE_SHED_RETRY_AFTER)
+        self.holds_slot = True
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, 'holds_slot', False):
+            self.holds_slot = False
+            get_slots().release()
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,126 @@
+from itertools import groupby
+
+from django.db.models import Value
+from django.db.models.functions import LPad
+from django.utils.html import format_html
+
+from . import models
+
+RECORD_FIELDS = (
+    'year',
+    'semester',
+    'course__course_code',
+    'course__course_title',
+    'course__course_credit',
+    'gpa',
+)
+
+# `semester` is free text, so '10' sorts before '2'. Left-padding to the column
+# width orders numeric semesters by value and keeps named ones ('1st', '2nd') stable.
+SEMESTER_ORDER = LPad('semester', 10, Value('0'))
+
+
+def student_records(student):
+    """
+    All of a student's results in transcript order, as one joined query.\n
+    Rows are `(year, semester, course_code, course_title, credit, gpa)` tuples
+    read through a server-side cursor.
+    """
+    return (
+        models.StudentRecord.objects
+        .filter(student=student)
+        .order_by('year', SEMESTER_ORDER, 'course__course_code')
+        .values_list(*RECORD_FIELDS)
+        .iterator(chunk_size=500)
+    )
+
+
+def grade_point_average(points, credits):
+    return round(points / credits, 2) if credits else 0.0
+
+
+def iter_semesters(records):
+    """
+    Group ordered result rows into semesters, computing the credit-weighted GPA
+    of each as it goes.
+    """
+    for (year, semester), rows in groupby(records, key=lambda row: (row[0], row[1])):
+        courses = []
+        credits = 0.0
+        points = 0.0
+
+        for _, _, code, title, credit, gpa in rows:
+            courses.append({'course_code': code, 'course_title': title, 'credit': credit, 'gpa': gpa})
+            credits += credit
+            points += gpa * credit
+
+        yield {
+            'year': year,
+            'semester': semester,
+            'courses': courses,
+            'credits': credits,
+            'points': points,
+            'gpa': grade_point_average(points, credits),
+        }
+
+
+class Totals:
+    """
+    Running cumulative figures. `earned_credits` only counts courses with a
+    non-zero grade point; the CGPA is weighted over every attempted credit.
+    """
+
+    def __init__(self):
+        self.credits = 0.0
+        self.points = 0.0
+        self.earned_credits = 0.0
+
+    def add(self, semester):
+        self.credits += semester['credits']
+        self.points += semester['points']
+        self.earned_credits += sum(course['credit'] for course in semester['courses'] if course['gpa'] > 0)
+
+    @property
+    def cgpa(self):
+        return grade_point_average(self.points, self.credits)
+
+
+def build_transcript(student):
+    totals = Totals()
+    semesters = []
+
+    for semester in iter_semesters(student_records(student)):
+        totals.add(semester)
+        semesters.append(semester)
+
+    return {
+        'semesters': semesters,
+        'cgpa': totals.cgpa,
+        'total_credits': totals.earned_credits,
+    }
+
+
+def iter_transcript_html(student):
+    totals = Totals()
+
+    for semester in iter_semesters(student_records(student)):
+        totals.add(semester)
+        yield format_html('<h3>{} {}</h3>\n<table>\n', semester['semester'], semester['year'])
+        yield '<tr><th>Course</th><th>Title</th><th>Credit</th><th>Grade point</th></tr>\n'
+        for course in semester['courses']:
+            yield format_html(
+                '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>\n',
+                course['course_code'],
+                course['course_title'],
+                course['credit'],
+                course['gpa'],
+            )
+        yield format_html(
+            '</table>\n<p>Semester GPA: {} &middot; Credits: {} &middot; CGPA to date: {}</p>\n',
+            semester['gpa'],
+            semester['credits'],
+            totals.cgpa,
+        )
+
+    yield format_html('<h3>CGPA: {} &middot; Credits earned: {}</h3>\n', totals.cgpa, totals.earned_credits)
+
@@ -1,17 +1,39 @@
 from django.urls import path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularSwaggerView
 from . import views
 
 urlpatterns = [
-    path('schemas/', SpectacularAPIView.as_view(), name="schemas"),
+    path('schemas/', views.SchemaView.as_view(), name="schemas"),
     path('schemas/docs', SpectacularSwaggerView.as_view(url_name="schemas")),
 
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
+
     path('token/', views.CustomTokenObtainPairView.as_view(), name='get-token'),
     path('token/refresh/', views.CustomTokenRefreshView.as_view(), name='refresh-token'),
     path('register/', views.CustomUserCreate.as_view(), name='register'),
+    path('otp/', views.OTPIssueView.as_view(), name='otp-issue'),
+    path('otp/verify/', views.OTPVerifyView.as_view(), name='otp-verify'),
+    path('register/bulk/', views.CustomUserBulkCreate.as_view(), name='register-bulk'),
 
     # API v1
     path('v1/users/me/', views.V1CurrentUser.as_view(), name='current-user'),
+    path('v1/users/me/transcript/', views.V1CurrentUserTranscript.as_view(), name='current-user-transcript'),
+    path('v1/users/me/photo/', views.V1CurrentUserPhoto.as_view(), name='current-user-photo'),
+    path('v1/photos/<slug:digest>/', views.V1PhotoView.as_view(), name='user-photo'),
+    path('v1/catalog/', views.V1CatalogView.as_view(), name='catalog'),
+    path('v1/analytics/courses/', views.V1AnalyticsView.as_view(group='courses'), name='analytics-courses'),
+    path('v1/analytics/departments/', views.V1AnalyticsView.as_view(group='departments'), name='analytics-departments'),
+    path('v1/analytics/faculties/', views.V1AnalyticsView.as_view(group='faculties'), name='analytics-faculties'),
     path('v1/info/', views.V1ApiGreet.as_view(), name='hello-world-message'),
     path('v1/services/', views.V1HandleServiceView.as_view(), name='service-list'),
+    path('v1/staff/services/', views.V1StaffServiceRequestList.as_view(), name='staff-service-list'),
+    path('v1/staff/records/import/', views.V1StaffRecordImport.as_view(), name='staff-record-import'),
+    path('v1/staff/search/students/', views.V1StaffSearch.as_view(kind='students'), name='staff-search-students'),
+    path('v1/staff/search/courses/', views.V1StaffSearch.as_view(kind='courses'), name='staff-search-courses'),
+    path('v1/staff/exports/students/', views.V1StaffExport.as_view(kind='students'), name='staff-export-students'),
+    path('v1/staff/exports/records/', views.V1StaffExport.as_view(kind='records'), name='staff-export-records'),
+    path('v1/services/<int:pk>/', views.V1ServiceRequestDetail.as_view(), name='service-detail'),
+    path('v1/services/<int:pk>/wait/', views.V1ServiceRequestWait.as_view(), name='service-wait'),
+    path('v1/services/<int:pk>/events/', views.V1ServiceRequestEvents.as_view(), name='service-events'),
+    path('v1/services/<int:pk>/document/', views.V1ServiceRequestDocument.as_view(), name='service-document'),
 ]
\ No newline at end of file
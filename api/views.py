@@ -1,13 +1,53 @@
+import hmac
+import json
+import shutil
+import tempfile
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiJsonRenderer2, OpenApiYamlRenderer, OpenApiYamlRenderer2
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from . import serializers
 from . import models
+from .analytics import get_summary
+from .async_views import AsyncAPIView, served_by_asgi
+from .authentication import user_cache
+from .catalog import get_catalog
+from .documents import RENDERERS, html_page, student_header
+from .events import status_hub
+from .exports import FORMATS, iter_export
+from .metrics import registry
+from .openapi import get_documents
+from .otp import OTPRateLimited, issue_otp, verify_otp
+from .pagination import InvalidCursor, keyset_page
+from .registration import UnreadableSheet, import_users, iter_csv_rows
+from .results import XLSX_CONTENT_TYPE, import_results, iter_xlsx_rows
+from .search import search
+from .responses import EventStreamRenderer, encoded_response, file_response
+from .services import aenqueue, document_path
+from .storage import NotAnImage, PhotoTooLarge, get_photo_store, is_digest
+from .throttling import EmailRateThrottle, IPRateThrottle, ShedLoadMixin
+from .transcripts import build_transcript, iter_transcript_html
+
+STAFF_PAGE_SIZE = 50
+STAFF_PAGE_MAX = 500
+SEARCH_LIMIT = 10
+SEARCH_LIMIT_MAX = 50
+FINAL_STATUSES = (models.ServiceRequest.COMPLETED, models.ServiceRequest.FAILED)
 
-class CustomUserCreate(APIView):
+class CustomUserCreate(ShedLoadMixin, APIView):
     """
     Register new users to the system using valid credentails.\n
     The account will be available after **activation** by the admins.
@@ -19,6 +59,8 @@ class CustomUserCreate(APIView):
     4. **role**: The role ID of the user. e.g. 1\n
     5. **session**: The session of the user. e.g. 2020-21\n
     """
+    throttle_scope = 'register'
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
 
     @extend_schema(
         request=serializers.CustomUserSerializer,
@@ -67,7 +109,172 @@ class CustomUserCreate(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CustomTokenObtainPairView(TokenObtainPairView):
+class CustomUserBulkCreate(APIView):
+    """
+    Register a whole intake of students in one request. **Admins only.**\n
+    Send either a JSON array of registration objects (same fields as **register/**) or a CSV body
+    with `Content-Type: text/csv` and a header row naming those fields.\n
+    Valid rows are created, invalid rows are reported by their 1-based position under `errors`.
+    """
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request=serializers.CustomUserSerializer(many=True),
+        responses={201: None, 400: None},
+        tags=["user management"]
+    )
+    def post(self, request):
+        if request.content_type.startswith('text/csv'):
+            if request.stream is None:
+                return Response({'detail': 'Empty CSV body'}, status=status.HTTP_400_BAD_REQUEST)
+            rows = iter_csv_rows(request.stream)
+        else:
+            rows = request.data
+            if not isinstance(rows, list):
+                return Response({'detail': 'Expected a JSON array of users'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            created, errors = import_users(rows)
+        except UnreadableSheet as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            return Response({'detail': 'Some users were registered concurrently, retry the import'}, status=status.HTTP_409_CONFLICT)
+
+        response_status = status.HTTP_201_CREATED if created or not errors else status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
+
+class OTPIssueView(APIView):
+    """
+    Send a one-time verification code to an email address.\n
+    Codes expire after a few minutes and issuing is rate limited per email and per client IP.
+    """
+    throttle_scope = 'otp'
+    throttle_classes = [IPRateThrottle]
+
+    @extend_schema(
+        request=serializers.OTPRequestSerializer,
+        responses={202: None, 400: None, 429: None},
+        tags=["user management"]
+    )
+    def post(self, request):
+        serializer = serializers.OTPRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            issue_otp(serializer.validated_data['email'])
+        except OTPRateLimited as exc:
+            return rate_limited_response(exc)
+
+        return Response({'detail': 'Verification code sent'}, status=status.HTTP_202_ACCEPTED)
+
+
+class OTPVerifyView(APIView):
+    """
+    Verify a one-time code sent to an email address. A verified code can't be reused.
+    """
+    throttle_scope = 'otp'
+    throttle_classes = [IPRateThrottle]
+
+    @extend_schema(
+        request=serializers.OTPVerifySerializer,
+        responses={200: None, 400: None, 429: None},
+        tags=["user management"]
+    )
+    def post(self, request):
+        serializer = serializers.OTPVerifySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            verified = verify_otp(serializer.validated_data['email'], serializer.validated_data['otp'])
+        except OTPRateLimited as exc:
+            return rate_limited_response(exc)
+
+        if not verified:
+            return Response({'detail': 'Invalid or expired code'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'detail': 'Email verified'}, status=status.HTTP_200_OK)
+
+
+def rate_limited_response(exc):
+    response = Response({'detail': str(exc)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+class V1CatalogView(APIView):
+    """
+    Reference data for the registration and request forms: roles, faculties, departments,
+    courses and document types.\n
+    Responses carry a strong `ETag`, answer `If-None-Match` with **304** and are compressed
+    when the client accepts `gzip` (or `br`).
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT, 304: None},
+        tags=["catalog"]
+    )
+    def get(self, request):
+        catalog = get_catalog()
+        return encoded_response(request, catalog.bodies, 'application/json', catalog.etag, 'public, no-cache')
+
+
+class SchemaView(APIView):
+    """
+    The OpenAPI schema of this API, as YAML or, with `?format=json` or a JSON `Accept`, as JSON.\n
+    Served from the schema committed with the code, so nothing is introspected per request.
+    Responses carry a strong `ETag`, answer `If-None-Match` with **304** and are compressed when
+    the client accepts `gzip` (or `br`).
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    renderer_classes = [OpenApiYamlRenderer, OpenApiYamlRenderer2, OpenApiJsonRenderer, OpenApiJsonRenderer2]
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT, 304: None},
+        tags=["schemas"]
+    )
+    def get(self, request):
+        renderer = request.accepted_renderer
+        etag, bodies = get_documents()[renderer.format]
+        response = encoded_response(request, bodies, f'{renderer.media_type}; charset=utf-8', etag, 'public, no-cache')
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+
+class MetricsView(APIView):
+    """
+    Request metrics of this server process in the Prometheus text format.\n
+    Scrapers must send `METRICS_TOKEN` as a bearer token. Without a token configured the
+    endpoint only exists while `DEBUG` is on.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @extend_schema(exclude=True)
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        if not token and not settings.DEBUG:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        if token and not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+            return Response({'detail': 'Invalid metrics token'}, status=status.HTTP_403_FORBIDDEN)
+
+        cache_stats = user_cache.stats()
+        body = registry.render([
+            ('api_auth_user_cache_hits_total', 'counter', 'Authenticated user cache hits.', cache_stats['hits']),
+            ('api_auth_user_cache_misses_total', 'counter', 'Authenticated user cache misses.', cache_stats['misses']),
+            ('api_auth_user_cache_size', 'gauge', 'Users in the authenticated user cache.', cache_stats['size']),
+        ])
+        return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class CustomTokenObtainPairView(ShedLoadMixin, TokenObtainPairView):
+    throttle_scope = 'login'
+    throttle_classes = [IPRateThrottle, EmailRateThrottle]
+
     @extend_schema(
         tags=["user management"]
     )
@@ -76,6 +283,9 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
 
 class CustomTokenRefreshView(TokenRefreshView):
+    throttle_scope = 'refresh'
+    throttle_classes = [IPRateThrottle]
+
     @extend_schema(
         tags=["user management"]
     )
@@ -83,49 +293,76 @@ class CustomTokenRefreshView(TokenRefreshView):
         return super().post(request, *args, **kwargs)
 
 
-class V1ApiGreet(APIView):
+class V1ApiGreet(AsyncAPIView):
     
     @extend_schema(
         tags=["test"]
     )
-    def get(self, request):
+    async def get(self, request):
         """
         Simple `Hello World` message from the **/api/v1/info/** endpoint.
         """
         return Response({"message": "Hello, World from API version 1!"}, status=status.HTTP_200_OK)
 
 
-class V1CurrentUser(APIView):
+FIELDS_PARAMETER = OpenApiParameter(
+    name="fields",
+    type=str,
+    location=OpenApiParameter.QUERY,
+    description="Comma-separated fields to return, e.g. **email,student_id**. Defaults to all.",
+    required=False
+)
+
+
+class V1CurrentUser(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
-        tags=["authenticated user management"]
+        tags=["authenticated user management"],
+        parameters=[FIELDS_PARAMETER],
+        responses={200: serializers.CustomUserSerializer, 400: None},
     )
-    def get(self, request):
+    async def get(self, request):
         """
         Get the current user's information.\n
         The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
         """
-        serializer = serializers.CustomUserSerializer(request.user)
+        try:
+            fields = serializers.CustomUserSerializer.select_fields(request.query_params.get('fields'))
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = serializers.CustomUserSerializer(request.user, fields=fields)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
     @extend_schema(
         request=serializers.CustomUserSerializer,
+        parameters=[FIELDS_PARAMETER],
         responses={200: serializers.CustomUserSerializer, 400: None},
         tags=["authenticated user management"]
     )
-    def put(self, request):
+    async def put(self, request):
         """
         Update the current user's information.\n
-        **Partial updates are allowed.**\n
+        **Partial updates are allowed.** Only the columns that change are written.\n
         The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
         """
-        
-        serializer = serializers.CustomUserSerializer(request.user, data=request.data, partial=True)
+        try:
+            fields = serializers.CustomUserSerializer.select_fields(request.query_params.get('fields'))
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = serializers.CustomUserSerializer(request.user, data=request.data, partial=True, fields=fields)
         
         if serializer.is_valid():
-            serializer.save()
+            if 'password' in serializer.validated_data:
+                # Hashing waits on the password pool; keep it off the event loop.
+                changed = await sync_to_async(serializer.apply)(request.user, serializer.validated_data)
+            else:
+                changed = serializer.apply(request.user, serializer.validated_data)
+            if changed:
+                await request.user.asave(update_fields=changed)
             return Response(serializer.data, status=status.HTTP_200_OK)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -133,19 +370,148 @@ class V1CurrentUser(APIView):
     @extend_schema(
         tags=["authenticated user management"]
     )
-    def delete(self, request):
+    async def delete(self, request):
         """
         Delete the current user's account.\n
         The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
         """
         user = request.user
-        user.delete()
+        await user.adelete()
         return Response({"detail": "User account deleted successfully."}, status=status.HTTP_404_NOT_FOUND)
 
 
-class V1HandleServiceView(APIView):
+class V1CurrentUserTranscript(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["authenticated user management"],
+        parameters=[
+            OpenApiParameter(
+                name="render",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description="Pass **html** to stream a printable transcript instead of JSON.",
+                required=False
+            )
+        ],
+    )
+    def get(self, request):
+        """
+        Get the current user's transcript: per-semester GPA, cumulative CGPA and credits earned.\n
+        The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
+        """
+        if request.query_params.get('render') == 'html':
+            chunks = html_page('Transcript', [student_header(request.user), iter_transcript_html(request.user)])
+            return StreamingHttpResponse(chunks, content_type='text/html; charset=utf-8')
+
+        return Response(build_transcript(request.user), status=status.HTTP_200_OK)
+
+
+class V1CurrentUserPhoto(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request={'image/*': OpenApiTypes.BINARY},
+        responses={200: None, 400: None, 413: None, 415: None},
+        tags=["authenticated user management"]
+    )
+    def put(self, request):
+        """
+        Upload the current user's photo as the raw request body.\n
+        Send the image bytes with an `image/*` **Content-Type**; the body is streamed to the photo store
+        and the response contains the new `user_photo` URL. Only JPEG, PNG, GIF and WebP content is accepted.\n
+        The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
+        """
+        if not request.content_type.startswith('image/') or request.stream is None:
+            return Response({'detail': 'Send the photo as an image/* request body'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            digest = get_photo_store().save_stream(request.stream)
+        except PhotoTooLarge as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except NotAnImage as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+        user = request.user
+        user.photo_digest = digest
+        user.save(update_fields=['photo_digest', 'updated_at'])
+        return Response({'user_photo': serializers.photo_url(user)}, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        tags=["authenticated user management"]
+    )
+    def delete(self, request):
+        """
+        Remove the current user's photo.\n
+        The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
+        """
+        user = request.user
+        user.photo_digest = None
+        user.save(update_fields=['photo_digest', 'updated_at'])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class V1PhotoView(APIView):
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        responses={200: OpenApiTypes.BINARY, 206: OpenApiTypes.BINARY, 304: None, 404: None},
+        tags=["authenticated user management"]
+    )
+    def get(self, request, digest):
+        """
+        Serve a stored photo by its content hash.\n
+        Responses carry a strong `ETag` and honour `If-None-Match` and single `Range` requests.\n
+        """
+        store = get_photo_store()
+        if not is_digest(digest) or not store.exists(digest):
+            return Response({'detail': 'Photo not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        response = file_response(request, store.path(digest), store.content_type(digest), digest)
+        # Stored bytes are served as the type they were sniffed as, never what a browser guesses.
+        response['X-Content-Type-Options'] = 'nosniff'
+        return response
+
+
+class V1HandleServiceView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
+    @extend_schema(
+        tags=["service management"],
+        parameters=[
+            OpenApiParameter(
+                name="doc_type",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description="No longer accepted here: `POST` to request a document.",
+                deprecated=True,
+            )
+        ],
+        responses={200: serializers.ServiceRequestSerializer(many=True), 400: None},
+    )
+    async def get(self, request):
+        """
+        List the current user's service requests, newest first.\n
+        Documents used to be requested with `GET ?doc_type=`; that now gets **400**, so
+        old clients fail loudly instead of silently receiving the list.\n
+        The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
+        """
+        if 'doc_type' in request.query_params:
+            return Response(
+                {"detail": "Request documents with POST; GET lists your service requests."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        requests = (
+            models.ServiceRequest.objects
+            .filter(student=request.user)
+            .select_related('request_doc')
+            .order_by('-created_at', '-id')
+        )
+        serializer = serializers.ServiceRequestSerializer([sr async for sr in requests], many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @extend_schema(
         tags=["service management"],
         parameters=[
@@ -158,32 +524,385 @@ class V1HandleServiceView(APIView):
             )
         ],
         responses={
-            200: None,
+            202: serializers.ServiceRequestSerializer,
             400: None,
         },
         request=None,
     )
-    def get(self, request):
+    async def post(self, request):
         """
-        Request for services with the query parameter `doc_type`\n
+        Request for services with the parameter `doc_type` (query string or JSON body)\n
         ## Supported document types are:\n
         1. **testimonial**\n
         2. **certificate**\n
         3. **transcript**\n
-    
+
+        The request is queued and generated in the background. Poll the returned `status_url`
+        and download the document from `document_url` once the status is **Completed**.\n
         The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
         """
 
-        doc_type = request.query_params.get('doc_type')
+        doc_type = request.query_params.get('doc_type') or request.data.get('doc_type')
+        document = None
+
+        if doc_type and doc_type.lower() in RENDERERS:
+            document = await models.Document.objects.filter(name__iexact=doc_type).afirst()
+
+        if document is None:
+            return Response({"detail": "Invalid document request received!"}, status=status.HTTP_400_BAD_REQUEST)
+
+        service_request = await aenqueue(request.user, document)
+        serializer = serializers.ServiceRequestSerializer(service_request)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class V1StaffServiceRequestList(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=["service management"],
+        parameters=[
+            OpenApiParameter(name="status", type=str, location=OpenApiParameter.QUERY, description="e.g. **Pending**, **Completed**"),
+            OpenApiParameter(name="document", type=int, location=OpenApiParameter.QUERY, description="Document ID"),
+            OpenApiParameter(name="department", type=int, location=OpenApiParameter.QUERY, description="Department ID of the student"),
+            OpenApiParameter(name="cursor", type=str, location=OpenApiParameter.QUERY, description="The `next` cursor of the previous page"),
+            OpenApiParameter(name="limit", type=int, location=OpenApiParameter.QUERY, description=f"Page size, at most {STAFF_PAGE_MAX}"),
+        ],
+        responses={200: serializers.StaffServiceRequestSerializer(many=True), 400: None},
+    )
+    def get(self, request):
+        """
+        List every service request, newest first. **Staff only.**\n
+        Pages are addressed by an opaque `cursor`; follow `next` until it is `null`.\n
+        """
+        params = request.query_params
+        requests = models.ServiceRequest.objects.select_related('student', 'request_doc')
+
+        try:
+            limit = min(int(params.get('limit', STAFF_PAGE_SIZE)), STAFF_PAGE_MAX)
+            if params.get('status'):
+                requests = requests.filter(status=params['status'])
+            if params.get('document'):
+                requests = requests.filter(request_doc_id=int(params['document']))
+            if params.get('department'):
+                requests = requests.filter(student__department_id=int(params['department']))
+            rows, next_cursor = keyset_page(requests, params.get('cursor'), max(limit, 1))
+        except (ValueError, InvalidCursor):
+            return Response({"detail": "Invalid filter or cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_url = None
+        if next_cursor:
+            query = params.copy()
+            query['cursor'] = next_cursor
+            next_url = f"{request.path}?{query.urlencode()}"
+
+        serializer = serializers.StaffServiceRequestSerializer(rows, many=True)
+        return Response({'results': serializer.data, 'next': next_url}, status=status.HTTP_200_OK)
+
+
+class V1StaffRecordImport(APIView):
+    """
+    Import a results sheet into the students' records. **Staff only.**\n
+    Send the sheet as the raw request body, either CSV (`Content-Type: text/csv`) or XLSX, with a
+    header row naming `student_id`, `course_code`, `year`, `semester` and `gpa`. A row for a result
+    that already exists replaces its `gpa`, so re-uploading a corrected sheet is safe.\n
+    Valid rows are written in chunks, invalid rows are reported by their 1-based position under `errors`.
+    A sheet that can't be read to the end (not UTF-8, not a workbook) gets **400** with `detail` naming
+    the row it stopped at; the rows before it stay imported.
+    """
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        request={'text/csv': OpenApiTypes.BINARY, XLSX_CONTENT_TYPE: OpenApiTypes.BINARY},
+        responses={200: None, 400: None},
+        tags=["service management"]
+    )
+    def post(self, request):
+        if request.stream is None:
+            return Response({'detail': 'Empty results sheet'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.content_type.startswith('text/csv'):
+            summary = import_results(iter_csv_rows(request.stream))
+        elif request.content_type.startswith(XLSX_CONTENT_TYPE):
+            # XLSX is a zip archive and needs a seekable file; spill large uploads to disk.
+            with tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE) as sheet:
+                shutil.copyfileobj(request.stream, sheet)
+                sheet.seek(0)
+                summary = import_results(iter_xlsx_rows(sheet))
+        else:
+            return Response({'detail': 'Send the sheet as text/csv or XLSX'}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
 
-        if doc_type == "testimonial":
-            # Handle the request for testimonial
-            return Response({"message": "Testimonial request received."}, status=status.HTTP_200_OK)
-        elif doc_type == "certificate":
-            # Handle the request for certificate
-            return Response({"message": "Certificate request received."}, status=status.HTTP_200_OK)
-        elif doc_type == "transcript":
-            # Handle the request for transcript
-            return Response({"message": "Transcript request received."}, status=status.HTTP_200_OK)
+        if 'detail' in summary:
+            # Chunks before the unreadable row are already written; the summary says how far it got.
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif summary['written'] or not summary['error_count']:
+            response_status = status.HTTP_200_OK
         else:
-            return Response({"detail": "Invalid document request received!"}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(summary, status=response_status)
+
+
+class V1AnalyticsView(APIView):
+    """
+    Result statistics per course, department, or faculty and session. **Staff only.**\n
+    `results` counts the recorded results (course enrollments), `average_gpa` is their mean grade point
+    and `pass_rate` the share with a non-zero grade point. Figures come from summaries maintained as
+    results are written and are cached for `ANALYTICS_CACHE_TTL` seconds.
+    """
+    permission_classes = [IsAdminUser]
+    group = None
+
+    @extend_schema(
+        tags=["analytics"],
+        parameters=[
+            OpenApiParameter(name="session", type=str, location=OpenApiParameter.QUERY, description="Student session, e.g. **2020-21**"),
+            OpenApiParameter(name="department", type=int, location=OpenApiParameter.QUERY, description="Department ID of the course"),
+            OpenApiParameter(name="faculty", type=int, location=OpenApiParameter.QUERY, description="Faculty ID of the course"),
+        ],
+        responses={200: None, 400: None},
+    )
+    def get(self, request):
+        params = request.query_params
+        try:
+            filters = {
+                'session': params.get('session') or None,
+                'department': int(params['department']) if params.get('department') else None,
+                'faculty': int(params['faculty']) if params.get('faculty') else None,
+            }
+        except ValueError:
+            return Response({"detail": "Invalid filter"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'results': get_summary(self.group, **filters)}, status=status.HTTP_200_OK)
+
+
+class V1StaffExport(APIView):
+    """
+    Download every student, or every result joined with its student and course, for registrar
+    reporting. **Staff only.**\n
+    Rows are streamed as they are read from the database, as CSV (default) or JSON Lines with
+    `output=jsonl`. Students' `user_photo` URLs are left out unless `include_photo=true`.
+    """
+    permission_classes = [IsAdminUser]
+    kind = None
+
+    @extend_schema(
+        tags=["analytics"],
+        parameters=[
+            OpenApiParameter(name="output", type=str, location=OpenApiParameter.QUERY, description="**csv** or **jsonl**"),
+            OpenApiParameter(name="session", type=str, location=OpenApiParameter.QUERY, description="Student session, e.g. **2020-21**"),
+            OpenApiParameter(name="department", type=int, location=OpenApiParameter.QUERY, description="Department ID of the student"),
+            OpenApiParameter(name="include_photo", type=bool, location=OpenApiParameter.QUERY, description="Add the `user_photo` column to the students export"),
+        ],
+        responses={200: OpenApiTypes.BINARY, 400: None},
+    )
+    def get(self, request):
+        params = request.query_params
+        output = params.get('output', 'csv')
+        if output not in FORMATS:
+            return Response({"detail": "Unknown output format"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            department = int(params['department']) if params.get('department') else None
+        except ValueError:
+            return Response({"detail": "Invalid filter"}, status=status.HTTP_400_BAD_REQUEST)
+
+        chunks = iter_export(
+            self.kind,
+            output,
+            include_photo=params.get('include_photo') in ('1', 'true'),
+            session=params.get('session') or None,
+            department=department,
+        )
+        response = StreamingHttpResponse(chunks, content_type=FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="{self.kind}-{timezone.localdate().isoformat()}.{output}"'
+        return response
+
+
+class V1StaffSearch(APIView):
+    """
+    Find students by name, email, student ID or session, or courses by code or title. **Staff only.**\n
+    Every word of `q` must match the start of a word, so it can be called on each keystroke for
+    typeahead. Results are ranked by relevance and served from a full-text index.
+    """
+    permission_classes = [IsAdminUser]
+    kind = None
+
+    @extend_schema(
+        tags=["search"],
+        parameters=[
+            OpenApiParameter(name="q", type=str, location=OpenApiParameter.QUERY, description="e.g. **rahim 2001**"),
+            OpenApiParameter(name="limit", type=int, location=OpenApiParameter.QUERY, description=f"At most {SEARCH_LIMIT_MAX}"),
+        ],
+        responses={200: None, 400: None},
+    )
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', SEARCH_LIMIT)), 1), SEARCH_LIMIT_MAX)
+        except ValueError:
+            return Response({"detail": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search(self.kind, request.query_params.get('q', ''), limit)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+class V1ServiceRequestDetail(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["service management"],
+        responses={200: serializers.ServiceRequestSerializer, 404: None},
+    )
+    async def get(self, request, pk):
+        """
+        Get the status of one of the current user's service requests.\n
+        The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
+        """
+        service_request = await (
+            models.ServiceRequest.objects
+            .select_related('request_doc')
+            .filter(pk=pk, student=request.user)
+            .afirst()
+        )
+        if service_request is None:
+            return Response({"detail": "Service request not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = serializers.ServiceRequestSerializer(service_request)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+async def load_service_request(pk, student):
+    return await (
+        models.ServiceRequest.objects
+        .select_related('request_doc')
+        .filter(pk=pk, student=student)
+        .afirst()
+    )
+
+
+class V1ServiceRequestWait(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["service management"],
+        parameters=[
+            OpenApiParameter(
+                name="status",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description="The last status the client saw, e.g. **Pending**. Defaults to the current status.",
+                required=False
+            ),
+            OpenApiParameter(
+                name="timeout",
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description="Seconds to wait for a change. The server caps this, more tightly when it isn't running under ASGI.",
+                required=False
+            ),
+        ],
+        responses={200: serializers.ServiceRequestSerializer, 400: None, 404: None},
+    )
+    async def get(self, request, pk):
+        """
+        Long-poll one of the current user's service requests.\n
+        Returns as soon as its status differs from `status`, or with the unchanged request once
+        `timeout` runs out. Loop on this instead of polling **v1/services/{id}/**.\n
+        The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
+        """
+        wait_max = settings.SERVICE_EVENTS_WAIT_MAX if served_by_asgi(request) else settings.SERVICE_EVENTS_WSGI_WAIT_MAX
+        try:
+            timeout = min(int(request.query_params.get('timeout', wait_max)), wait_max)
+        except ValueError:
+            return Response({"detail": "Invalid timeout"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Subscribe before reading so a change in between is still delivered.
+        subscription = status_hub.subscribe(pk)
+        try:
+            service_request = await load_service_request(pk, request.user)
+            if service_request is None:
+                return Response({"detail": "Service request not found"}, status=status.HTTP_404_NOT_FOUND)
+
+            subscription.status = request.query_params.get('status') or service_request.status
+            if service_request.status == subscription.status and await subscription.changed(max(timeout, 0)):
+                service_request = await load_service_request(pk, request.user)
+        finally:
+            subscription.close()
+
+        serializer = serializers.ServiceRequestSerializer(service_request)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class V1ServiceRequestEvents(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, EventStreamRenderer]
+
+    @extend_schema(
+        tags=["service management"],
+        responses={(200, 'text/event-stream'): OpenApiTypes.STR, 404: None, 501: None},
+    )
+    async def get(self, request, pk):
+        """
+        Stream one of the current user's service requests as server-sent events.\n
+        A `status` event carrying the request is sent straight away and again on every status change;
+        the stream ends once the request is **Completed** or **Failed**. Needs the ASGI server
+        (`SERVER_MODE=asgi`); under WSGI it answers **501**, use **v1/services/{id}/wait/** instead.\n
+        The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
+        """
+        if not served_by_asgi(request):
+            # A stream would hold a WSGI worker thread for up to SERVICE_EVENTS_STREAM_MAX.
+            return Response(
+                {"detail": "Event streams need the ASGI server, long-poll v1/services/{id}/wait/ instead"},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+
+        if await load_service_request(pk, request.user) is None:
+            return Response({"detail": "Service request not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(self.stream(pk, request.user), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, pk, student):
+        subscription = status_hub.subscribe(pk)
+        try:
+            deadline = time.monotonic() + settings.SERVICE_EVENTS_STREAM_MAX
+            while True:
+                service_request = await load_service_request(pk, student)
+                if service_request is None:
+                    return
+                subscription.status = service_request.status
+                data = json.dumps(serializers.ServiceRequestSerializer(service_request).data, default=str)
+                yield f'event: status\ndata: {data}\n\n'
+                if service_request.status in FINAL_STATUSES:
+                    return
+
+                while not await subscription.changed(settings.SERVICE_EVENTS_KEEPALIVE):
+                    if time.monotonic() > deadline:
+                        return
+                    yield ': keep-alive\n\n'
+        finally:
+            subscription.close()
+
+
+class V1ServiceRequestDocument(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["service management"],
+        responses={200: OpenApiTypes.BINARY, 404: None},
+    )
+    def get(self, request, pk):
+        """
+        Download the generated document of a completed service request.\n
+        The user must be `authenticated` with valid **JWT token** to access this endpoint.\n
+        """
+        service_request = models.ServiceRequest.objects.filter(
+            pk=pk,
+            student=request.user,
+            status=models.ServiceRequest.COMPLETED,
+        ).first()
+        if service_request is None or not document_path(service_request).is_file():
+            return Response({"detail": "Document not available"}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = f'{service_request.pk}-{int(service_request.updated_at.timestamp())}'
+        return file_response(request, document_path(service_request), 'text/html; charset=utf-8', etag, cache_control='private, no-cache')
@@ -0,0 +1,20 @@
+# Entry point for spawned service workers. Kept free of model imports so the
+# child can unpickle its target before the app registry is ready.
+import signal
+
+
+def worker_main(stop_event, poll_interval):
+    # Ctrl-C reaches the whole process group; let the parent stop us through
+    # the event so the current job finishes.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    import django
+    django.setup()
+
+    from django.db import connections
+    from .services import work
+
+    try:
+        work(stop_event, poll_interval)
+    finally:
+        connections.close_all()
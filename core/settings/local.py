@@ -1,4 +1,5 @@
-from decouple import config
+import os
+from decouple import Csv, config
 from datetime import timedelta
 from pathlib import Path
 
@@ -33,7 +34,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -45,9 +48,12 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.CachedJWTAuthentication",
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Proxies in front of the app that append to X-Forwarded-For. With 0 the client IP
+    # the throttles key on is the connection's address, and the header is ignored.
+    'NUM_PROXIES': config("NUM_PROXIES", default=0, cast=int),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -56,6 +62,9 @@ SPECTACULAR_SETTINGS = {
         {"name": "user management"},
         {"name": "authenticated user management"},
         {"name": "service management"},
+        {"name": "analytics"},
+        {"name": "search"},
+        {"name": "catalog"},
         {"name": "test"},
         {"name": "schemas"},
     ],
@@ -66,6 +75,18 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
 }
 
+# Authenticated user cache: per-process LRU, invalidated through a version
+# stamp kept in the AUTH_USER_CACHE_ALIAS cache. Off when that cache is
+# per-process (e.g. LocMemCache) and there is more than one SERVER_WORKERS.
+AUTH_USER_CACHE_ALIAS = config("AUTH_USER_CACHE_ALIAS", default="default")
+AUTH_USER_CACHE_TTL = config("AUTH_USER_CACHE_TTL", default=300, cast=int)
+AUTH_USER_CACHE_MAX_SIZE = config("AUTH_USER_CACHE_MAX_SIZE", default=10000, cast=int)
+
+# Seconds a process keeps serving its copy of the catalog when the default cache is
+# per-process and there is more than one SERVER_WORKERS, as other processes' changes
+# can't reach it
+CATALOG_LOCAL_TTL = config("CATALOG_LOCAL_TTL", default=5, cast=int)
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -97,6 +118,18 @@ DATABASES = {
 }
 
 
+# Cache
+# Point CACHE_BACKEND/CACHE_LOCATION at a shared backend (e.g. Redis) when
+# running more than one process so invalidations reach every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': config("CACHE_BACKEND", default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config("CACHE_LOCATION", default=''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -116,6 +149,106 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Request instrumentation (api.middleware.RequestMetricsMiddleware), scraped from /api/metrics/
+REQUEST_METRICS_SAMPLE_RATE = config("REQUEST_METRICS_SAMPLE_RATE", default=1.0, cast=float)
+REQUEST_METRICS_SERVER_TIMING = config("REQUEST_METRICS_SERVER_TIMING", default=DEBUG, cast=bool)
+REQUEST_QUERY_BUDGET = config("REQUEST_QUERY_BUDGET", default=20, cast=int)
+# Scrapers must send it as "Authorization: Bearer <token>"; unset, metrics are only served with DEBUG on
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
+
+# New passwords are hashed with the first hasher; hashes made by the others still
+# verify and are replaced with a fresh one on the user's next successful login.
+PASSWORD_HASHERS = config("PASSWORD_HASHERS", cast=Csv(), default=",".join([
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]))
+
+# Web server processes per host; gunicorn.conf.py reads the same variable
+SERVER_WORKERS = config("SERVER_WORKERS", default=2 * (os.cpu_count() or 1) + 1, cast=int)
+
+# The most password hashes (registration, login, bulk registration) run at once in one
+# web process; above 1 they run in a pool of that many spawned processes. A host runs
+# up to SERVER_WORKERS * PASSWORD_HASH_WORKERS at once, so the default splits the
+# cores between the web processes, which with the default SERVER_WORKERS leaves 1.
+PASSWORD_HASH_WORKERS = config(
+    "PASSWORD_HASH_WORKERS", default=max(1, (os.cpu_count() or 1) // SERVER_WORKERS), cast=int,
+)
+
+BULK_REGISTER_CHUNK_SIZE = config("BULK_REGISTER_CHUNK_SIZE", default=500, cast=int)
+
+# Result sheet imports (python manage.py import_results, /api/v1/staff/records/import/)
+RESULTS_IMPORT_CHUNK_SIZE = config("RESULTS_IMPORT_CHUNK_SIZE", default=5000, cast=int)
+RESULTS_IMPORT_MAX_ERRORS = config("RESULTS_IMPORT_MAX_ERRORS", default=1000, cast=int)
+
+# Seconds the /api/v1/analytics/ figures are cached for
+ANALYTICS_CACHE_TTL = config("ANALYTICS_CACHE_TTL", default=60, cast=int)
+
+# Rows fetched per server-side cursor round trip by the student and record exports
+EXPORT_CHUNK_SIZE = config("EXPORT_CHUNK_SIZE", default=2000, cast=int)
+
+# Admin changelists of Postgres tables estimated at this many rows or more show the
+# planner's row estimate instead of running COUNT(*)
+ADMIN_ESTIMATED_COUNT_MIN = config("ADMIN_ESTIMATED_COUNT_MIN", default=10000, cast=int)
+
+# OpenAPI schema served at /api/schemas/, written by python manage.py build_schema
+OPENAPI_SCHEMA_PATH = config("OPENAPI_SCHEMA_PATH", default=str(BASE_DIR / 'openapi.json'))
+
+
+# Token-bucket limits ("<burst>/<refill period>") per client IP and per email for the
+# login, token refresh, registration and OTP endpoints, kept in THROTTLE_STORE:
+# api.throttling.LocalBucketStore (per process) or api.throttling.CacheBucketStore
+# (shared through the THROTTLE_CACHE_ALIAS cache).
+THROTTLE_STORE = config("THROTTLE_STORE", default="api.throttling.LocalBucketStore")
+THROTTLE_CACHE_ALIAS = config("THROTTLE_CACHE_ALIAS", default="default")
+THROTTLE_LOCAL_MAX_KEYS = config("THROTTLE_LOCAL_MAX_KEYS", default=100000, cast=int)
+THROTTLE_RATES = {
+    'login-ip': config("THROTTLE_LOGIN_IP_RATE", default="30/min"),
+    'login-email': config("THROTTLE_LOGIN_EMAIL_RATE", default="10/min"),
+    'refresh-ip': config("THROTTLE_REFRESH_IP_RATE", default="60/min"),
+    'register-ip': config("THROTTLE_REGISTER_IP_RATE", default="10/min"),
+    'register-email': config("THROTTLE_REGISTER_EMAIL_RATE", default="5/min"),
+    # Issuing and verifying codes together; OTP_ISSUE_LIMIT also caps each address
+    'otp-ip': config("THROTTLE_OTP_IP_RATE", default="10/min"),
+}
+# Login and registration requests allowed in flight per process before shedding with 429;
+# a few queued per hashing slot, so a burst waits briefly instead of piling up
+THROTTLE_MAX_CONCURRENT = config("THROTTLE_MAX_CONCURRENT", default=4 * PASSWORD_HASH_WORKERS, cast=int)
+THROTTLE_SHED_RETRY_AFTER = config("THROTTLE_SHED_RETRY_AFTER", default=1, cast=int)
+
+
+# Service request workers (python manage.py run_service_workers)
+DOCUMENT_STORAGE_ROOT = config("DOCUMENT_STORAGE_ROOT", default=str(BASE_DIR / 'media' / 'documents'))
+SERVICE_WORKERS = config("SERVICE_WORKERS", default=2, cast=int)
+SERVICE_POLL_INTERVAL = config("SERVICE_POLL_INTERVAL", default=1.0, cast=float)
+SERVICE_MAX_ATTEMPTS = config("SERVICE_MAX_ATTEMPTS", default=3, cast=int)
+SERVICE_CLAIM_TIMEOUT = config("SERVICE_CLAIM_TIMEOUT", default=600, cast=int)
+# Seconds before the first retry of a failed or abandoned request, doubling per attempt
+SERVICE_RETRY_BACKOFF = config("SERVICE_RETRY_BACKOFF", default=30, cast=int)
+
+# Rendered documents, reused the same day until the student's documents_version changes
+DOCUMENT_CACHE_ROOT = config("DOCUMENT_CACHE_ROOT", default=str(BASE_DIR / 'media' / 'document-cache'))
+DOCUMENT_CACHE_MAX_BYTES = config("DOCUMENT_CACHE_MAX_BYTES", default=512 * 1024 * 1024, cast=int)
+
+# Service request status waits: long-poll cap, event stream keep-alive and lifetime (seconds).
+# Without Postgres LISTEN/NOTIFY each web process polls the watched requests at this interval.
+SERVICE_EVENTS_WAIT_MAX = config("SERVICE_EVENTS_WAIT_MAX", default=30, cast=int)
+# Long-poll cap under WSGI, where every waiting client holds one of the worker's threads
+SERVICE_EVENTS_WSGI_WAIT_MAX = config("SERVICE_EVENTS_WSGI_WAIT_MAX", default=5, cast=int)
+SERVICE_EVENTS_KEEPALIVE = config("SERVICE_EVENTS_KEEPALIVE", default=15, cast=int)
+SERVICE_EVENTS_STREAM_MAX = config("SERVICE_EVENTS_STREAM_MAX", default=600, cast=int)
+SERVICE_EVENTS_POLL_INTERVAL = config("SERVICE_EVENTS_POLL_INTERVAL", default=1.0, cast=float)
+
+
+# One-time codes: lifetime and per-email attempts allowed per rate window (seconds)
+OTP_TTL = config("OTP_TTL", default=300, cast=int)
+OTP_RATE_WINDOW = config("OTP_RATE_WINDOW", default=3600, cast=int)
+OTP_ISSUE_LIMIT = config("OTP_ISSUE_LIMIT", default=5, cast=int)
+OTP_VERIFY_LIMIT = config("OTP_VERIFY_LIMIT", default=10, cast=int)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -132,6 +265,22 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Hashed, pre-compressed static files served by WhiteNoise; run collectstatic
+# before starting the production server.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# User photo blob store
+PHOTO_STORAGE_ROOT = config("PHOTO_STORAGE_ROOT", default=str(BASE_DIR / 'media' / 'photos'))
+PHOTO_MAX_SIZE = config("PHOTO_MAX_SIZE", default=5 * 1024 * 1024, cast=int)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -143,6 +292,12 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
 # Email settings
+# Defaults to printing mail to the console; use
+# 'django.core.mail.backends.filebased.EmailBackend' with EMAIL_FILE_PATH to
+# keep messages on disk, or the SMTP settings below in production.
+EMAIL_BACKEND = config("EMAIL_BACKEND", default='django.core.mail.backends.console.EmailBackend')
+EMAIL_FILE_PATH = config("EMAIL_FILE_PATH", default=str(BASE_DIR / 'media' / 'emails'))
+DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default='no-reply@localhost')
 # EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # EMAIL_HOST = config('EMAIL_HOST')
 # EMAIL_PORT = config('EMAIL_PORT', cast=int)
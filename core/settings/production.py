@@ -3,6 +3,19 @@ from decouple import config
 
 DEBUG = False
 
+# Timing headers reveal internals; opt in explicitly in production
+REQUEST_METRICS_SERVER_TIMING = config("REQUEST_METRICS_SERVER_TIMING", default=False, cast=bool)
+
+# Shared by every Gunicorn worker, which the authenticated user cache and the catalog
+# need for their invalidation stamps. The database cache needs `python manage.py createcachetable`;
+# point CACHE_BACKEND and CACHE_LOCATION at Redis or Memcached to use one instead.
+CACHES = {
+    'default': {
+        'BACKEND': config("CACHE_BACKEND", default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config("CACHE_LOCATION", default='django_cache'),
+    }
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -14,5 +27,20 @@ DATABASES = {
         'OPTIONS': {
             'sslmode': 'require',
         },
+        # Check a reused connection is still alive before handing it to a request
+        'CONN_HEALTH_CHECKS': config("DB_CONN_HEALTH_CHECKS", default=True, cast=bool),
     }
 }
+
+# Either keep one persistent connection per worker thread (DB_CONN_MAX_AGE
+# seconds, 0 to close after every request) or, with DB_POOL=True, share a
+# psycopg connection pool per process. The two are mutually exclusive.
+if config("DB_POOL", default=False, cast=bool):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config("DB_POOL_MIN_SIZE", default=2, cast=int),
+        'max_size': config("DB_POOL_MAX_SIZE", default=10, cast=int),
+        'timeout': config("DB_POOL_TIMEOUT", default=10, cast=int),
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = config("DB_CONN_MAX_AGE", default=60, cast=int)
@@ -0,0 +1,39 @@
+"""
+Gunicorn configuration for serving the project in production.
+
+    gunicorn -c gunicorn.conf.py
+
+SERVER_MODE=wsgi (default) serves core.wsgi with threaded sync workers;
+SERVER_MODE=asgi serves core.asgi with uvicorn workers. Send HUP to the
+master process for a graceful reload.
+"""
+import multiprocessing
+
+# Gunicorn reads every module-level name here as a setting, hence the aliases.
+from decouple import config as env
+
+_mode = env("SERVER_MODE", default="wsgi")
+
+if _mode == "asgi":
+    wsgi_app = "core.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "core.wsgi:application"
+    worker_class = env("SERVER_WORKER_CLASS", default="gthread")
+    threads = env("SERVER_THREADS", default=4, cast=int)
+
+bind = env("SERVER_BIND", default="0.0.0.0:8000")
+workers = env("SERVER_WORKERS", default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+
+# Keep client connections open between requests and give in-flight requests
+# time to finish on reload or shutdown.
+keepalive = env("SERVER_KEEPALIVE", default=5, cast=int)
+timeout = env("SERVER_TIMEOUT", default=30, cast=int)
+graceful_timeout = env("SERVER_GRACEFUL_TIMEOUT", default=30, cast=int)
+
+# Recycle workers periodically, staggered so they don't all restart at once.
+max_requests = env("SERVER_MAX_REQUESTS", default=2000, cast=int)
+max_requests_jitter = env("SERVER_MAX_REQUESTS_JITTER", default=200, cast=int)
+
+accesslog = "-"
+errorlog = "-"